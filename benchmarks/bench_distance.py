@@ -0,0 +1,51 @@
+# bench_distance.py
+"""So sánh tính khoảng cách từng điểm bằng geodesic với kernel NumPy trong utils.geo.
+
+Chạy: python -m benchmarks.bench_distance [số POI]
+"""
+import random
+import sys
+import time
+from geopy.distance import geodesic
+from services.poi import POI
+from utils.geo import distances_to
+
+
+def make_places(n, lat, lon, spread=0.05):
+    rng = random.Random(42)
+    return [
+        POI(id=i, osm_type="node", name=f"Quán {i}", address="",
+            lat=lat + rng.uniform(-spread, spread), lon=lon + rng.uniform(-spread, spread))
+        for i in range(n)
+    ]
+
+
+def best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    lat, lon = 10.7623, 106.6821
+    places = make_places(n, lat, lon)
+
+    t_geo = best_of(lambda: [geodesic((lat, lon), (p.lat, p.lon)).meters for p in places])
+    t_np = best_of(lambda: distances_to(lat, lon, places))
+
+    exact = [geodesic((lat, lon), (p.lat, p.lon)).meters for p in places]
+    approx = distances_to(lat, lon, places)
+    max_err = max(abs(a - e) / e for a, e in zip(approx, exact) if e > 0)
+
+    print(f"{n} POI")
+    print(f"geodesic  : {t_geo * 1000:8.2f} ms")
+    print(f"numpy     : {t_np * 1000:8.2f} ms  (nhanh hơn {t_geo / t_np:.0f}x)")
+    print(f"sai số tương đối lớn nhất: {max_err * 100:.3f}%")
+
+
+if __name__ == "__main__":
+    main()
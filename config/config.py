@@ -1,4 +1,8 @@
 # config.py
+import os
+
+# Thư mục gốc của dự án: locales/ và data/ luôn nằm cạnh mã nguồn, không phụ thuộc thư mục đang chạy
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 BASE_TEXTS = {
     "app_title": "🍜 Tìm Quán Ăn",
@@ -6,6 +10,7 @@ BASE_TEXTS = {
     "use_current_location": "📍 Dùng vị trí hiện tại",
     "gps_ok": "GPS OK!",
     "enter_location": "Nhập địa điểm",
+    "location_suggestions": "Gợi ý địa điểm",
     "default_location": "Đại học Khoa học Tự Nhiên",
     "what_to_eat": "Bạn muốn ăn gì?",
     "default_dish": "Bánh mì",
@@ -86,5 +91,114 @@ BASE_TEXTS = {
     "home_suggestion_label": "🔥 Gợi ý:",
     "home_suggestion_list": "Phở, Bánh mì, Cơm tấm, Pizza, Cà phê, Trà sữa"
     ,
-    "real_route_unavailable": "Không lấy được lộ trình thực tế. Hiện hiển thị khoảng cách ước lượng."
+    "real_route_unavailable": "Không lấy được lộ trình thực tế. Hiện hiển thị khoảng cách ước lượng.",
+    "tour_pick": "🍽️ Food tour: chọn {}–{} quán để đi lần lượt",
+    "tour_need_more": "Chọn thêm quán (ít nhất {}) để lên lộ trình food tour.",
+    "tour_title": "🍽️ Lộ trình food tour",
+    "tour_stop": "Điểm dừng {}: {}",
+    "search_by_time": "⏱️ Tìm theo thời gian di chuyển",
+    "max_minutes": "Thời gian tối đa (phút)",
+    "isochrone_unavailable": "Không tính được vùng đi tới trong {} phút, tạm tìm trong bán kính ước lượng ~{:.1f} km.",
+    "cuisine_filter": "Loại món"
+}
+
+# Mã bộ lọc ngân sách (khớp giá giả lập "$"/"$$"/"$$$") -> khóa nhãn trong BASE_TEXTS.
+# Bộ lọc so sánh bằng mã nên không phụ thuộc ngôn ngữ hay bản dịch.
+BUDGET_OPTIONS = {
+    "all": "budget_all",
+    "$": "budget_cheap",
+    "$$": "budget_medium",
+    "$$$": "budget_expensive",
+}
+
+# --- NGÔN NGỮ ---
+LANGUAGE_OPTIONS = {
+    "vi": "🇻🇳 Tiếng Việt",
+    "en": "🇬🇧 English",
+    "zh": "🇨🇳 中文",
+    "ko": "🇰🇷 한국어",
+    "ja": "🇯🇵 日本語",
+    "fr": "🇫🇷 Français",
+    "es": "🇪🇸 Español",
+    "th": "🇹🇭 ไทย",
+    "ar": "🇸🇦 العربية",
+    "pt": "🇧🇷 Português (BR)"
 }
+# Thư mục chứa bản dịch dựng sẵn (python -m utils.catalogs), mỗi ngôn ngữ một file <lang>.json
+CATALOG_DIR = os.path.join(PROJECT_DIR, "locales")
+# Cache bản dịch động dùng chung mọi session (None = chỉ giữ trong RAM)
+TRANSLATION_CACHE_PATH = os.path.join(PROJECT_DIR, "data", "translations.sqlite3")
+TRANSLATION_TIMEOUT = 5
+TRANSLATION_WORKERS = 4
+# Sau một lần dịch lỗi, chờ bao nhiêu giây mới thử lại ngôn ngữ đó
+TRANSLATION_RETRY_AFTER = 60
+
+# --- CẤU HÌNH TRUY VẤN OSM ---
+# "area": tải toàn bộ POI ăn uống theo ô bản đồ (tile) rồi lọc món tại chỗ
+# "query": gửi truy vấn Overpass đã lọc theo món cho từng lần tìm (cách cũ)
+OSM_FETCH_MODE = "area"
+# Zoom 15 ~ ô cạnh 1.2 km ở TP.HCM
+OSM_TILE_ZOOM = 15
+OSM_TILE_CACHE_SIZE = 20000
+OSM_TILE_TTL = 3600
+
+# Kho POI trên đĩa (SQLite, theo ô bản đồ), đặt None để tắt
+POI_STORE_PATH = os.path.join(PROJECT_DIR, "data", "poi_store.sqlite3")
+POI_STORE_MAX_AGE = 7 * 24 * 3600
+
+# Cache geocode (Nominatim) theo truy vấn đã chuẩn hóa; kết quả "không tìm thấy" giữ ngắn hơn
+GEOCODE_CACHE_PATH = os.path.join(PROJECT_DIR, "data", "geocode.sqlite3")
+GEOCODE_CACHE_TTL = 30 * 24 * 3600
+GEOCODE_NEGATIVE_TTL = 3600
+# Nominatim cho phép tối đa 1 request/giây; người gọi chờ trong hàng đợi tối đa GEOCODE_WAIT giây
+GEOCODE_MIN_INTERVAL = 1.0
+GEOCODE_WAIT = 10
+
+# Gợi ý địa điểm khi gõ: chỉ mục tên đã biết (kho POI + địa danh từ file OSM), dựng lại sau PLACE_INDEX_TTL giây
+PLACE_INDEX_TTL = 600
+PLACE_SUGGEST_LIMIT = 8
+
+# --- CẤU HÌNH DẪN ĐƯỜNG ---
+# Làm tròn tọa độ đầu/cuối 4 chữ số thập phân (~11 m) khi tạo khóa cache lộ trình
+ROUTE_COORD_PRECISION = 4
+ROUTE_CACHE_SIZE = 2000
+ROUTE_CACHE_TTL = 1800
+# Nhớ ngắn các lần OSRM table lỗi để rerun không chờ lại upstream
+ROUTE_FAILURE_TTL = 30
+# Tổng thời gian tối đa cho một lần get_route (mọi mode/lần thử) trước khi dùng lộ trình ước lượng
+ROUTE_DEADLINE = 8
+OSRM_FAILURE_THRESHOLD = 3
+OSRM_RESET_TIMEOUT = 30
+# Tải trước lộ trình cho N kết quả đầu ở luồng nền sau mỗi lần tìm kiếm (0 để tắt)
+ROUTE_PREFETCH_COUNT = 5
+ROUTE_PREFETCH_WORKERS = 2
+# Hàng đợi tải trước dùng chung mọi session: tối đa bao nhiêu job chờ, và job chờ quá bao nhiêu giây thì bỏ
+ROUTE_PREFETCH_MAX_PENDING = 20
+ROUTE_PREFETCH_MAX_AGE = 5
+# Vận tốc trung bình (m/s) theo phương tiện: ước lượng thời gian khi chưa có lộ trình thật, bán kính
+# isochrone, và vận tốc đi bộ / xe đạp của router cục bộ
+TRAVEL_SPEEDS = {"walking": 1.2, "cycling": 3.5, "driving": 7.0}
+# Xếp hạng sau khi có thời gian di chuyển thực tế: điểm quán chia cho (1 + thời gian / hằng số này),
+# tức quán cách TRAVEL_RANK_SECONDS giây bị giảm một nửa điểm (0 để chỉ xếp theo điểm)
+TRAVEL_RANK_SECONDS = 600
+# Tìm theo thời gian di chuyển: số hướng x số vòng điểm mẫu (gộp trong một request table),
+# cache đa giác theo ô lưới zoom 17 (~300 m) quanh điểm xuất phát
+ISOCHRONE_BEARINGS = 16
+ISOCHRONE_RINGS = 5
+ISOCHRONE_MAX_RADIUS = 5000
+ISOCHRONE_CELL_ZOOM = 17
+ISOCHRONE_CACHE_SIZE = 500
+ISOCHRONE_CACHE_TTL = 3600
+# Số quán tối thiểu/tối đa cho một food tour
+TOUR_MIN_STOPS = 3
+TOUR_MAX_STOPS = 8
+# "osrm": gọi router.project-osrm.org; "local": dùng đồ thị dựng sẵn bởi services.local_router
+# (không có file đồ thị thì tự quay về OSRM)
+ROUTING_BACKEND = "osrm"
+# Sai số cho phép (pixel màn hình) khi rút gọn đường đi trước khi vẽ; 0 để vẽ đủ mọi điểm
+ROUTE_SIMPLIFY_PIXELS = 1.0
+# Độ chi tiết cố định cho mỗi lộ trình: zoom vừa khung lộ trình (ít nhất zoom mặc định của bản đồ)
+# cộng thêm ROUTE_SIMPLIFY_EXTRA_ZOOM nấc, để phóng to vài nấc vẫn không thấy khác
+ROUTE_SIMPLIFY_EXTRA_ZOOM = 2
+MAP_ZOOM_START = 15
+LOCAL_ROUTER_GRAPH = os.path.join(PROJECT_DIR, "data", "road_graph.pkl")
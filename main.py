@@ -4,6 +4,7 @@ from utils.translate import get_text
 from views.map_view import render_map_tab
 from views.chatbot_view import render_chatbot_tab
 from config.styles import load_css
+from config.config import LANGUAGE_OPTIONS
 
 st.set_page_config(page_title="Smart Restaurant Finder", layout="wide")
 
@@ -76,18 +77,7 @@ with st.sidebar:
     ">🌐 Language</div>
     """, unsafe_allow_html=True)
 
-    language_options = {
-        "vi": "🇻🇳 Tiếng Việt",
-        "en": "🇬🇧 English",
-        "zh": "🇨🇳 中文",
-        "ko": "🇰🇷 한국어",
-        "ja": "🇯🇵 日本語",
-        "fr": "🇫🇷 Français",
-        "es": "🇪🇸 Español",
-        "th": "🇹🇭 ไทย",
-        "ar": "🇸🇦 العربية",
-        "pt": "🇧🇷 Português (BR)"
-    }
+    language_options = LANGUAGE_OPTIONS
 
     selected_lang = st.selectbox(
         get_text("language", st.session_state.language),
@@ -123,10 +113,6 @@ lang = st.session_state.language
 
 if selected_lang != st.session_state.language:
     st.session_state.language = selected_lang
-    
-    if "translations_cache" in st.session_state:
-        del st.session_state.translations_cache
-        
     st.rerun()
 
 # --- MAIN INTERFACE ---
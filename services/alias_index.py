@@ -0,0 +1,57 @@
+# alias_index.py
+from bisect import bisect_left
+
+
+class AliasIndex:
+    """Chỉ mục tra cứu alias đã chuẩn hóa, dựng một lần lúc import.
+
+    - exact: dict term -> danh sách payload (tra cứu khớp chính xác)
+    - suffixes: danh sách hậu tố đã sắp xếp, dùng bisect để tìm các term chứa một chuỗi con
+    """
+
+    def __init__(self, entries):
+        self.exact = {}
+        suffixes = []
+
+        for term, payload in entries:
+            if not term: continue
+            if term not in self.exact:
+                self.exact[term] = []
+                for i in range(len(term)):
+                    suffixes.append((term[i:], term))
+            self.exact[term].append(payload)
+
+        suffixes.sort()
+        self.suffix_keys = [s for s, _ in suffixes]
+        self.suffix_terms = [t for _, t in suffixes]
+        # Chỉ cần thử các độ dài term thực sự tồn tại khi quét chuỗi con của truy vấn
+        self.lengths = sorted({len(t) for t in self.exact})
+
+    def __len__(self):
+        return len(self.exact)
+
+    def get(self, term):
+        return self.exact.get(term, [])
+
+    def terms_in(self, text):
+        """Các term xuất hiện như chuỗi con trong text."""
+        found = []
+        n = len(text)
+        for i in range(n):
+            for length in self.lengths:
+                if i + length > n: break
+                piece = text[i:i + length]
+                if piece in self.exact:
+                    found.append(piece)
+        return found
+
+    def terms_containing(self, text):
+        """Các term có chứa text như chuỗi con (tìm theo tiền tố trên mảng hậu tố)."""
+        found = set()
+        if not text: return found
+        keys = self.suffix_keys
+        i = bisect_left(keys, text)
+        while i < len(keys) and keys[i].startswith(text):
+            found.add(self.suffix_terms[i])
+            i += 1
+        return found
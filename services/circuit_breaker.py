@@ -0,0 +1,67 @@
+# circuit_breaker.py
+import threading
+import time
+
+
+class CircuitBreaker:
+    """Ngắt mạch cho một dịch vụ upstream, dùng chung giữa các session.
+
+    - closed: gọi bình thường; failure_threshold lỗi liên tiếp -> open
+    - open: allow() trả về False ngay để caller dùng phương án dự phòng; cứ mỗi
+      reset_timeout giây chạy probe() ở luồng nền, thành công thì đóng mạch lại
+    """
+
+    def __init__(self, name, failure_threshold=3, reset_timeout=30, probe=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe = probe
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None: return True
+            if self.probe is None:
+                # Không có probe: cho đúng một lần gọi thử sau reset_timeout (half-open)
+                if time.monotonic() - self.opened_at >= self.reset_timeout:
+                    self.opened_at = time.monotonic()
+                    return True
+                return False
+            if not self.probing and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.probing = True
+                threading.Thread(target=self.run_probe, name=f"{self.name}-probe", daemon=True).start()
+            return False
+
+    def run_probe(self):
+        try:
+            ok = bool(self.probe())
+        except Exception:
+            ok = False
+        with self.lock:
+            self.probing = False
+            if ok:
+                self.failures = 0
+                self.opened_at = None
+            else:
+                self.opened_at = time.monotonic()
+        if ok:
+            print(f"{self.name}: upstream hoạt động trở lại")
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold and self.opened_at is None:
+                self.opened_at = time.monotonic()
+                print(f"{self.name}: ngắt mạch sau {self.failures} lỗi liên tiếp")
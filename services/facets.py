@@ -0,0 +1,75 @@
+# facets.py
+import bisect
+import numpy as np
+
+
+def cuisine_values(place):
+    """Các giá trị cuisine của POI ("vietnamese;noodle" -> ["vietnamese", "noodle"]), rỗng thì dùng amenity."""
+    values = [c.strip().lower() for c in place.cuisine.replace(",", ";").split(";") if c.strip()]
+    return values or [place.cuisine_label]
+
+
+class FacetIndex:
+    """Chỉ mục facet trên toàn bộ kết quả đã tải (đã xếp theo điểm): giá, cuisine, khoảng cách, rating.
+
+    Mỗi giá trị facet giữ một mặt nạ bool NumPy, nên đổi bộ lọc chỉ là AND vài mặt nạ trong bộ nhớ,
+    không phải gọi lại Overpass hay xử lý lại dữ liệu. Bộ lọc dùng mã cố định ("$", "vietnamese",
+    ngưỡng mét...) chứ không dùng nhãn đã dịch.
+    """
+
+    def __init__(self, places, distance_buckets=(500, 1000, 2000, 3000, 5000)):
+        self.places = list(places)
+        self.distance_buckets = list(distance_buckets)
+        self.facets = {"price": {}, "cuisine": {}, "distance": {}, "rating": {}}
+        for pos, place in enumerate(self.places):
+            self.add("price", place.price, pos)
+            for cuisine in cuisine_values(place):
+                self.add("cuisine", cuisine, pos)
+            # Bucket khoảng cách: ngưỡng nhỏ nhất >= khoảng cách (ngoài ngưỡng cuối thì None)
+            i = bisect.bisect_left(self.distance_buckets, place.distance_sort)
+            self.add("distance", self.distance_buckets[i] if i < len(self.distance_buckets) else None, pos)
+            # Rating làm tròn xuống theo nửa sao: 4.3 -> 4.0, 4.7 -> 4.5
+            self.add("rating", int(place.rating * 2) / 2, pos)
+
+        n = len(self.places)
+        self.masks = {
+            facet: {value: self.to_mask(positions, n) for value, positions in values.items()}
+            for facet, values in self.facets.items()
+        }
+
+    def add(self, facet, value, pos):
+        self.facets[facet].setdefault(value, []).append(pos)
+
+    @staticmethod
+    def to_mask(positions, n):
+        mask = np.zeros(n, dtype=bool)
+        mask[positions] = True
+        return mask
+
+    def values(self, facet):
+        """Các giá trị của facet kèm số kết quả, nhiều nhất trước."""
+        counts = {v: len(p) for v, p in self.facets[facet].items() if v is not None}
+        return sorted(counts.items(), key=lambda kv: (-kv[1], str(kv[0])))
+
+    def union(self, facet, values):
+        mask = np.zeros(len(self.places), dtype=bool)
+        for value in values:
+            if value in self.masks[facet]:
+                mask |= self.masks[facet][value]
+        return mask
+
+    def filter(self, price=None, cuisine=None, max_distance=None, min_rating=None, limit=None):
+        """Các POI thỏa mọi bộ lọc (None = không lọc), giữ thứ tự điểm ban đầu."""
+        mask = np.ones(len(self.places), dtype=bool)
+        if price is not None:
+            mask &= self.union("price", [price])
+        if cuisine is not None:
+            mask &= self.union("cuisine", [cuisine])
+        if max_distance is not None:
+            mask &= self.union("distance", [b for b in self.distance_buckets if b <= max_distance])
+        if min_rating is not None:
+            mask &= self.union("rating", [r for r in self.facets["rating"] if r >= min_rating])
+        positions = np.flatnonzero(mask)
+        if limit is not None:
+            positions = positions[:limit]
+        return [self.places[i] for i in positions.tolist()]
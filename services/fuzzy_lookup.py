@@ -0,0 +1,100 @@
+# fuzzy_lookup.py
+import heapq
+import time
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def bounded_levenshtein(a, b, max_dist):
+    """Khoảng cách Levenshtein, dừng sớm và trả về max_dist + 1 khi vượt ngưỡng."""
+    if abs(len(a) - len(b)) > max_dist: return max_dist + 1
+    if len(a) > len(b): a, b = b, a
+
+    prev = list(range(len(a) + 1))
+    for j, cb in enumerate(b, 1):
+        cur = [j]
+        row_min = j
+        for i, ca in enumerate(a, 1):
+            cost = min(prev[i] + 1, cur[i - 1] + 1, prev[i - 1] + (ca != cb))
+            cur.append(cost)
+            if cost < row_min: row_min = cost
+        if row_min > max_dist: return max_dist + 1
+        prev = cur
+    return prev[-1] if prev[-1] <= max_dist else max_dist + 1
+
+
+def max_typos(length):
+    """Số lỗi gõ cho phép theo độ dài truy vấn: chuỗi ngắn không được phép sai."""
+    if length < 4: return 0
+    if length < 8: return 1
+    return 2
+
+
+class FuzzyIndex:
+    """Chỉ mục trigram trên tập term đã chuẩn hóa, xác nhận ứng viên bằng edit distance có chặn.
+
+    Posting của mỗi trigram được chia theo độ dài term, nên chỉ đếm các term dài xấp xỉ truy vấn
+    (|len - qlen| <= số lỗi cho phép). Trigram quá phổ biến (> max_posting term) được bỏ qua và
+    ngưỡng trigram chung hạ tương ứng. Ngân sách thời gian (time_budget, giây) được kiểm tra cả
+    lúc gom ứng viên lẫn lúc xác nhận, nhưng luôn xác nhận ít nhất limit ứng viên tốt nhất.
+    """
+
+    def __init__(self, terms, max_candidates=200, max_posting=2000):
+        self.terms = list(dict.fromkeys(t for t in terms if t))
+        self.postings = {}
+        for term_id, term in enumerate(self.terms):
+            for gram in trigrams(term):
+                self.postings.setdefault(gram, {}).setdefault(len(term), []).append(term_id)
+        self.max_candidates = max_candidates
+        self.max_posting = max_posting
+
+    def gram_postings(self, gram, lengths):
+        by_length = self.postings.get(gram)
+        if not by_length: return []
+        return [ids for length in lengths for ids in (by_length.get(length),) if ids]
+
+    def lookup(self, query, limit=5, time_budget=0.005):
+        """Trả về danh sách (term, distance) xếp theo độ gần, tối đa limit phần tử."""
+        max_dist = max_typos(len(query))
+        if not max_dist: return []
+        deadline = time.perf_counter() + time_budget
+
+        grams = trigrams(query)
+        lengths = range(len(query) - max_dist, len(query) + max_dist + 1)
+        # Trigram hiếm trước: ứng viên tốt xuất hiện sớm nếu phải dừng giữa chừng
+        postings = sorted(
+            ((sum(len(ids) for ids in lists), lists) for lists in (self.gram_postings(g, lengths) for g in grams)),
+            key=lambda item: item[0]
+        )
+
+        shared = {}
+        skipped = len(grams) - len(postings)
+        for n, (size, lists) in enumerate(postings):
+            if n and (size > self.max_posting or time.perf_counter() > deadline):
+                skipped += len(postings) - n
+                break
+            for ids in lists:
+                for term_id in ids:
+                    shared[term_id] = shared.get(term_id, 0) + 1
+
+        # Mỗi lỗi gõ làm mất tối đa 3 trigram chung; trigram bị bỏ qua không đếm được
+        min_shared = max(1, len(grams) - 3 * max_dist - skipped)
+        candidates = heapq.nsmallest(
+            self.max_candidates,
+            (tid for tid, count in shared.items() if count >= min_shared),
+            key=lambda tid: (-shared[tid], tid)
+        )
+
+        found = []
+        for n, tid in enumerate(candidates):
+            if n >= limit and time.perf_counter() > deadline: break
+            term = self.terms[tid]
+            dist = bounded_levenshtein(query, term, max_dist)
+            if dist <= max_dist:
+                found.append((dist, -shared[tid], tid, term))
+
+        found.sort()
+        return [(term, dist) for dist, _, _, term in found[:limit]]
@@ -0,0 +1,95 @@
+# geocoder.py
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+
+class GeocodeCache:
+    """Cache kết quả geocode theo truy vấn đã chuẩn hóa: dict trong RAM + SQLite (tùy chọn).
+
+    Kết quả "không tìm thấy" cũng được cache nhưng với hạn ngắn hơn (negative_ttl).
+    """
+
+    def __init__(self, path=None, ttl=30 * 24 * 3600, negative_ttl=3600):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.lock = threading.Lock()
+        self.memory = {}
+        self.conn = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS geocodes (
+                       query TEXT PRIMARY KEY, name TEXT, lat REAL, lon REAL, fetched_at REAL NOT NULL)""")
+            for query, name, lat, lon, fetched_at in self.conn.execute("SELECT * FROM geocodes"):
+                result = {"name": name, "lat": lat, "lon": lon} if lat is not None else None
+                self.memory[query] = (result, fetched_at)
+
+    def get(self, key):
+        """(True, kết quả) nếu còn hạn trong cache, (False, None) nếu chưa có."""
+        with self.lock:
+            entry = self.memory.get(key)
+        if entry is None: return False, None
+        result, fetched_at = entry
+        ttl = self.ttl if result is not None else self.negative_ttl
+        if time.time() - fetched_at > ttl: return False, None
+        return True, result
+
+    def set(self, key, result):
+        fetched_at = time.time()
+        with self.lock:
+            self.memory[key] = (result, fetched_at)
+            if self.conn:
+                r = result or {}
+                with self.conn:
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO geocodes VALUES (?, ?, ?, ?, ?)",
+                        (key, r.get("name"), r.get("lat"), r.get("lon"), fetched_at))
+
+
+class GeocodeQueue:
+    """Hàng đợi geocode dùng chung: một luồng duy nhất gọi upstream, cách nhau ít nhất min_interval giây
+    (chính sách 1 request/giây của Nominatim), truy vấn trùng khóa đang chờ dùng chung một Future.
+    """
+
+    def __init__(self, lookup, cache, min_interval=1.0):
+        self.lookup = lookup
+        self.cache = cache
+        self.min_interval = min_interval
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.jobs = queue.Queue()
+        self.last_call = 0.0
+        threading.Thread(target=self.worker, name="geocode-queue", daemon=True).start()
+
+    def submit(self, key, query):
+        with self.lock:
+            future = self.pending.get(key)
+            if future is None:
+                future = self.pending[key] = Future()
+                self.jobs.put((key, query, future))
+        return future
+
+    def worker(self):
+        while True:
+            key, query, future = self.jobs.get()
+            # Có thể đã có kết quả do một lần gọi trước đó vừa ghi cache
+            hit, result = self.cache.get(key)
+            if not hit:
+                wait = self.last_call + self.min_interval - time.monotonic()
+                if wait > 0: time.sleep(wait)
+                self.last_call = time.monotonic()
+                try:
+                    result = self.lookup(query)
+                    self.cache.set(key, result)
+                except Exception as e:
+                    # Lỗi mạng/upstream: không cache để lần sau còn thử lại
+                    print(f"Geocode Error: {e}")
+                    result = None
+            with self.lock:
+                self.pending.pop(key, None)
+            future.set_result(result)
@@ -0,0 +1,15 @@
+# http_client.py
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+
+
+@st.cache_resource
+def get_http_session():
+    """Session HTTP dùng chung cho cả tiến trình: giữ kết nối keep-alive tới OSRM/Overpass
+    thay vì bắt tay TCP mới cho mỗi request."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
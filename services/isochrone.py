@@ -0,0 +1,86 @@
+# isochrone.py
+"""Vùng đi tới được trong N phút (isochrone) quanh một điểm, dùng cho tìm kiếm theo thời gian.
+
+Lấy mẫu các điểm trên ISOCHRONE_BEARINGS hướng x ISOCHRONE_RINGS vòng, hỏi quãng đường thực
+tế tới tất cả trong MỘT lần get_travel_matrix (OSRM table hoặc bộ định tuyến offline), rồi
+trên mỗi hướng lấy biên là điểm xa nhất còn tới được liên tục từ tâm. Qua sông/đường cao
+tốc không có cầu thì hướng đó bị cắt ngắn, khác với vòng tròn bán kính.
+
+Thời gian = quãng đường thực tế / vận tốc của phương tiện, cùng cách tính với nhãn thời gian
+trên thẻ quán. Đa giác được cache theo ô lưới quanh điểm xuất phát.
+"""
+import streamlit as st
+from services.route_service import get_travel_matrix, travel_speed
+from services.ttl_cache import TTLCache
+from utils.geo import latlon_to_tile, tile_bounds, offset_point, haversine_m, points_in_polygon
+from config.config import (
+    ISOCHRONE_BEARINGS, ISOCHRONE_RINGS, ISOCHRONE_MAX_RADIUS, ISOCHRONE_CELL_ZOOM,
+    ISOCHRONE_CACHE_SIZE, ISOCHRONE_CACHE_TTL
+)
+
+
+@st.cache_resource
+def get_isochrone_cache():
+    return TTLCache(maxsize=ISOCHRONE_CACHE_SIZE, ttl=ISOCHRONE_CACHE_TTL)
+
+
+def origin_cell(lat, lon):
+    """Tâm ô lưới chứa (lat, lon): mọi điểm xuất phát trong cùng ô dùng chung một đa giác."""
+    x, y = latlon_to_tile(lat, lon, ISOCHRONE_CELL_ZOOM)
+    south, west, north, east = tile_bounds(x, y, ISOCHRONE_CELL_ZOOM)
+    return (x, y), ((south + north) / 2, (west + east) / 2)
+
+
+def boundary_distance(rings, times, limit):
+    """Bán kính biên trên một hướng: nội suy giữa vòng cuối còn tới kịp và vòng đầu tiên không kịp."""
+    last_r, last_t = 0.0, 0.0
+    for r, t in zip(rings, times):
+        if t is None:
+            # Không có đường tới điểm mẫu này: dừng ở vòng trước
+            return last_r
+        if t > limit:
+            return last_r + (r - last_r) * (limit - last_t) / (t - last_t)
+        last_r, last_t = r, t
+    return last_r
+
+
+def compute_isochrone(lat, lon, minutes, mode="driving"):
+    """Đa giác [(lat, lon), ...] các điểm tới được trong minutes phút, None khi không lấy được dữ liệu."""
+    speed = travel_speed(mode)
+    limit = minutes * 60
+    max_radius = min(limit * speed, ISOCHRONE_MAX_RADIUS)
+    rings = [max_radius * (k + 1) / ISOCHRONE_RINGS for k in range(ISOCHRONE_RINGS)]
+    bearings = [360 * i / ISOCHRONE_BEARINGS for i in range(ISOCHRONE_BEARINGS)]
+
+    samples = [offset_point(lat, lon, b, r) for b in bearings for r in rings]
+    distances, _ = get_travel_matrix(lat, lon, samples, mode)
+    if distances is None: return None
+
+    polygon = []
+    for i, b in enumerate(bearings):
+        row = distances[i * ISOCHRONE_RINGS:(i + 1) * ISOCHRONE_RINGS]
+        times = [d / speed if d is not None else None for d in row]
+        polygon.append(offset_point(lat, lon, b, boundary_distance(rings, times, limit)))
+    return polygon
+
+
+def get_isochrone(lat, lon, minutes, mode="driving"):
+    """Đa giác isochrone (đã cache theo ô lưới) và bán kính bao ngoài (m) tính từ (lat, lon)."""
+    cell, (c_lat, c_lon) = origin_cell(lat, lon)
+    key = (cell, minutes, mode)
+    cache = get_isochrone_cache()
+    polygon = cache.get(key)
+    if polygon is None:
+        polygon = compute_isochrone(c_lat, c_lon, minutes, mode)
+        if polygon is None: return None, None
+        cache.set(key, polygon)
+    # Bán kính đủ chứa cả đa giác để tải POI một lần rồi lọc
+    radius = int(max(haversine_m(lat, lon, p_lat, p_lon) for p_lat, p_lon in polygon)) + 1
+    return polygon, radius
+
+
+def places_in_isochrone(places, polygon):
+    """Giữ lại các POI nằm trong đa giác, theo đúng thứ tự."""
+    if not places: return []
+    mask = points_in_polygon([p.lat for p in places], [p.lon for p in places], polygon)
+    return [p for p, ok in zip(places, mask.tolist()) if ok]
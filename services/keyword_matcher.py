@@ -0,0 +1,81 @@
+# keyword_matcher.py
+from collections import deque
+
+
+def is_word_char(ch):
+    # Cùng định nghĩa với \w của module re cho chuỗi unicode
+    return ch.isalnum() or ch == "_"
+
+
+def is_boundary(text, pos):
+    """Tương đương \\b tại vị trí pos của text."""
+    before = pos > 0 and is_word_char(text[pos - 1])
+    after = pos < len(text) and is_word_char(text[pos])
+    return before != after
+
+
+class KeywordMatcher:
+    """Automaton Aho-Corasick dựng một lần cho cả danh sách từ khóa.
+
+    Quét văn bản một lượt O(len(text)) thay vì thử từng từ khóa.
+    Từ khóa có độ dài <= boundary_max_len chỉ được tính khi đứng thành từ riêng
+    (tương đương regex r"\\bkw\\b"), tránh "bo" khớp nhầm vào "bonjour".
+    """
+
+    def __init__(self, patterns, boundary_max_len=0):
+        self.goto = [{}]
+        self.fail = [0]
+        # out[state] = danh sách (độ dài pattern, cần kiểm tra ranh giới từ)
+        self.out = [[]]
+        self.size = 0
+
+        for pattern in dict.fromkeys(patterns):
+            if not pattern: continue
+            self.add(pattern, len(pattern) <= boundary_max_len)
+        self.build()
+
+    def add(self, pattern, need_boundary):
+        state = 0
+        for ch in pattern:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            state = nxt
+        self.out[state].append((len(pattern), need_boundary))
+        self.size += 1
+
+    def build(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                fallback = self.goto[f].get(ch, 0)
+                self.fail[nxt] = fallback if fallback != nxt else 0
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def __bool__(self):
+        return self.size > 0
+
+    def search(self, text):
+        """True nếu có ít nhất một từ khóa xuất hiện trong text."""
+        if not text or not self.size: return False
+        goto, fail, out = self.goto, self.fail, self.out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, need_boundary in out[state]:
+                if not need_boundary:
+                    return True
+                if is_boundary(text, i + 1 - length) and is_boundary(text, i + 1):
+                    return True
+        return False
@@ -0,0 +1,442 @@
+# local_router.py
+"""Bộ định tuyến offline thay cho OSRM, dựng từ file OSM đã tải về.
+
+Dựng đồ thị:
+    python -m services.local_router ho-chi-minh.osm --out data/road_graph.pkl
+    python -m services.local_router ho-chi-minh.osm.pbf   (cần pyosmium)
+
+Đồ thị chỉ giữ các nút giao (node thuộc >= 2 way hoặc đầu/cuối way); các đoạn đường giữa
+hai nút giao được gộp thành một cạnh kèm hình học, nên số đỉnh A* phải duyệt giảm nhiều lần.
+Dữ liệu lưu bằng array/NumPy (không phải list/dict Python) để nạp nhanh và tốn ít RAM.
+"""
+import argparse
+import heapq
+import math
+import os
+import pickle
+import tempfile
+import time
+from array import array
+import numpy as np
+from utils.geo import haversine_m, METERS_PER_DEG_LAT
+from config.config import LOCAL_ROUTER_GRAPH, TRAVEL_SPEEDS
+
+# Tốc độ (km/h) cho ô tô/xe máy theo loại đường; đường không có trong bảng thì xe không đi được
+CAR_SPEEDS = {
+    "motorway": 60, "trunk": 50, "primary": 40, "secondary": 35, "tertiary": 30,
+    "unclassified": 25, "residential": 20, "living_street": 10, "service": 15,
+    "motorway_link": 40, "trunk_link": 35, "primary_link": 30, "secondary_link": 25, "tertiary_link": 20,
+}
+BIKE_EXCLUDED = {"motorway", "motorway_link", "trunk", "trunk_link", "steps", "construction", "proposed"}
+FOOT_EXCLUDED = {"motorway", "motorway_link", "trunk", "trunk_link", "construction", "proposed"}
+ROUTABLE = set(CAR_SPEEDS) | {"cycleway", "footway", "path", "pedestrian", "steps", "track", "road"}
+
+PROFILES = {
+    "driving": "car", "car": "car",
+    "walking": "foot", "foot": "foot",
+    "cycling": "bike", "bicycling": "bike", "bike": "bike",
+}
+# Vận tốc đi bộ / xe đạp (m/s) dùng chung bảng với ước lượng thời gian của ứng dụng
+FOOT_SPEED = TRAVEL_SPEEDS["walking"]
+BIKE_SPEED = TRAVEL_SPEEDS["cycling"]
+
+ONEWAY_YES = {"yes", "1", "true"}
+# Điểm cách nút giao gần nhất quá xa coi như nằm ngoài vùng đồ thị
+MAX_SNAP_DISTANCE = 1000
+
+
+def access(profile, tags):
+    """Trả về (tốc độ m/s, cho phép chiều xuôi, cho phép chiều ngược) hoặc None nếu không đi được."""
+    highway = tags.get("highway")
+    if highway not in ROUTABLE or tags.get("access") in ("no", "private"): return None
+
+    oneway = tags.get("oneway")
+    roundabout = tags.get("junction") in ("roundabout", "circular")
+    forward_only = oneway in ONEWAY_YES or (roundabout and oneway != "no")
+    backward_only = oneway == "-1"
+
+    if profile == "car":
+        if highway not in CAR_SPEEDS or tags.get("motor_vehicle") == "no": return None
+        speed = CAR_SPEEDS[highway] / 3.6
+    elif profile == "bike":
+        if highway in BIKE_EXCLUDED or tags.get("bicycle") == "no": return None
+        speed = BIKE_SPEED
+        if tags.get("oneway:bicycle") == "no":
+            forward_only = backward_only = False
+    else:
+        if highway in FOOT_EXCLUDED or tags.get("foot") == "no": return None
+        # Người đi bộ không bị ràng buộc đường một chiều
+        return FOOT_SPEED, True, True
+
+    return speed, not backward_only, not forward_only
+
+
+def bearing(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dl = math.radians(lon2 - lon1)
+    x = math.sin(dl) * math.cos(p2)
+    y = math.cos(p1) * math.sin(p2) - math.sin(p1) * math.cos(p2) * math.cos(dl)
+    return math.degrees(math.atan2(x, y)) % 360
+
+
+def turn_modifier(angle):
+    """angle: góc rẽ (-180, 180], dương là rẽ phải. Trả về modifier theo quy ước OSRM."""
+    a = abs(angle)
+    side = "right" if angle > 0 else "left"
+    if a < 20: return "straight"
+    if a < 60: return f"slight {side}"
+    if a < 120: return side
+    if a < 170: return f"sharp {side}"
+    return "uturn"
+
+
+class Profile:
+    """Danh sách kề dạng CSR của một loại phương tiện."""
+
+    def __init__(self, node_count, edges, max_speed):
+        # edges: danh sách (u, v, edge_ref, weight) đã lọc theo phương tiện
+        edges.sort(key=lambda e: e[0])
+        self.offsets = array("q", [0]) * (node_count + 1)
+        self.targets = array("q")
+        self.refs = array("q")
+        self.weights = array("d")
+        for u, v, ref, w in edges:
+            self.offsets[u + 1] += 1
+            self.targets.append(v)
+            self.refs.append(ref)
+            self.weights.append(w)
+        for i in range(node_count):
+            self.offsets[i + 1] += self.offsets[i]
+        self.max_speed = max_speed
+        # Chỉ bắt điểm vào các nút giao có cạnh đi ra với phương tiện này
+        out_degree = np.diff(np.frombuffer(self.offsets, dtype=np.int64))
+        self.snap_nodes = np.nonzero(out_degree > 0)[0]
+
+
+class LocalRouter:
+    """Đồ thị đường đã nén, trả lời truy vấn đường đi bằng A*."""
+
+    def __init__(self):
+        self.lats = array("d")
+        self.lons = array("d")
+        self.names = [""]
+        self.edge_name = array("q")
+        self.edge_length = array("d")
+        self.edge_roundabout = array("b")
+        self.geom_offsets = array("q", [0])
+        self.geom_lats = array("d")
+        self.geom_lons = array("d")
+        self.profiles = {}
+        self.np_lats = None
+        self.np_lons = None
+
+    # --- DỰNG ĐỒ THỊ ---
+    @classmethod
+    def build(cls, ways, coords):
+        """ways: danh sách (refs, tags); coords: dict node_id -> (lat, lon)."""
+        router = cls()
+        uses = {}
+        for refs, _ in ways:
+            for i, ref in enumerate(refs):
+                # Đầu/cuối way luôn là nút giao; node giữa chỉ là nút giao nếu thuộc nhiều way
+                uses[ref] = uses.get(ref, 0) + (2 if i in (0, len(refs) - 1) else 1)
+
+        node_index = {}
+        name_index = {"": 0}
+        per_profile = {"car": [], "foot": [], "bike": []}
+        max_speed = {"car": 0.0, "foot": 0.0, "bike": 0.0}
+
+        def junction(ref):
+            idx = node_index.get(ref)
+            if idx is None:
+                idx = node_index[ref] = len(router.lats)
+                router.lats.append(coords[ref][0])
+                router.lons.append(coords[ref][1])
+            return idx
+
+        for refs, tags in ways:
+            refs = [r for r in refs if r in coords]
+            if len(refs) < 2: continue
+            rules = {p: access(p, tags) for p in per_profile}
+            if not any(rules.values()): continue
+
+            name = tags.get("name", "")
+            if name not in name_index:
+                name_index[name] = len(router.names)
+                router.names.append(name)
+            roundabout = tags.get("junction") in ("roundabout", "circular")
+
+            start = 0
+            for i in range(1, len(refs)):
+                if i != len(refs) - 1 and uses.get(refs[i], 0) < 2: continue
+                segment = refs[start:i + 1]
+                start = i
+                points = [coords[r] for r in segment]
+                length = sum(haversine_m(*points[k], *points[k + 1]) for k in range(len(points) - 1))
+                u, v = junction(segment[0]), junction(segment[-1])
+                if u == v and length == 0: continue
+
+                eid = len(router.edge_length)
+                router.edge_length.append(length)
+                router.edge_name.append(name_index[name])
+                router.edge_roundabout.append(1 if roundabout else 0)
+                for lat, lon in points:
+                    router.geom_lats.append(lat)
+                    router.geom_lons.append(lon)
+                router.geom_offsets.append(len(router.geom_lats))
+
+                for profile, rule in rules.items():
+                    if not rule: continue
+                    speed, forward, backward = rule
+                    max_speed[profile] = max(max_speed[profile], speed)
+                    if forward: per_profile[profile].append((u, v, eid * 2, length / speed))
+                    if backward: per_profile[profile].append((v, u, eid * 2 + 1, length / speed))
+
+        for profile, edges in per_profile.items():
+            router.profiles[profile] = Profile(len(router.lats), edges, max_speed[profile])
+        router.prepare()
+        return router
+
+    def prepare(self):
+        self.np_lats = np.frombuffer(self.lats, dtype=np.float64)
+        self.np_lons = np.frombuffer(self.lons, dtype=np.float64)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Chỉ pickle kiểu dựng sẵn (array/ndarray/dict) để file đọc được dù lớp được nạp từ module nào
+        state = dict(self.__dict__, np_lats=None, np_lons=None,
+                     profiles={name: vars(p) for name, p in self.profiles.items()})
+        with open(path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        router = cls()
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        for name, fields in state.pop("profiles").items():
+            profile = router.profiles[name] = Profile.__new__(Profile)
+            profile.__dict__.update(fields)
+        router.__dict__.update(state)
+        router.prepare()
+        return router
+
+    # --- TRUY VẤN ---
+    def nearest_node(self, profile, lat, lon):
+        nodes = profile.snap_nodes
+        if nodes is None or not len(nodes): return None
+        k = math.cos(math.radians(lat))
+        d2 = (self.np_lats[nodes] - lat) ** 2 + ((self.np_lons[nodes] - lon) * k) ** 2
+        node = int(nodes[int(np.argmin(d2))])
+        if haversine_m(lat, lon, self.lats[node], self.lons[node]) > MAX_SNAP_DISTANCE: return None
+        return node
+
+    def edge_points(self, ref):
+        eid, backward = ref >> 1, ref & 1
+        a, b = self.geom_offsets[eid], self.geom_offsets[eid + 1]
+        points = list(zip(self.geom_lats[a:b], self.geom_lons[a:b]))
+        return points[::-1] if backward else points
+
+    def astar(self, profile, source, target):
+        """Trả về danh sách (edge_ref, thời gian) theo thứ tự đi, hoặc None nếu không có đường."""
+        offsets, targets, refs, weights = profile.offsets, profile.targets, profile.refs, profile.weights
+        lats, lons = self.lats, self.lons
+        t_lat, t_lon = lats[target], lons[target]
+        # Heuristic khả chấp: khoảng cách phẳng (hơi thấp hơn thực tế) / tốc độ lớn nhất
+        k_lat = METERS_PER_DEG_LAT * 0.995 / profile.max_speed
+        k_lon = k_lat * math.cos(math.radians(t_lat))
+
+        best = {source: 0.0}
+        prev = {}
+        heap = [(0.0, 0.0, source)]
+        while heap:
+            _, g, u = heapq.heappop(heap)
+            if u == target: break
+            if g > best[u]: continue
+            for i in range(offsets[u], offsets[u + 1]):
+                v = targets[i]
+                ng = g + weights[i]
+                if ng < best.get(v, math.inf):
+                    best[v] = ng
+                    prev[v] = (u, refs[i], weights[i])
+                    h = math.hypot((lats[v] - t_lat) * k_lat, (lons[v] - t_lon) * k_lon)
+                    heapq.heappush(heap, (ng + h, ng, v))
+        else:
+            return None
+
+        legs = []
+        node = target
+        while node != source:
+            u, ref, w = prev[node]
+            legs.append((ref, w))
+            node = u
+        legs.reverse()
+        return legs
+
+    def build_steps(self, legs):
+        """Gom các cạnh thành các bước chỉ đường có maneuver kiểu OSRM."""
+        steps = []
+        current = {"maneuver": {"type": "depart"}, "name": "", "distance": 0.0, "duration": 0.0}
+        prev_bearing = None
+        prev_name = None
+        in_roundabout = False
+
+        for ref, duration in legs:
+            eid = ref >> 1
+            points = self.edge_points(ref)
+            name = self.names[self.edge_name[eid]]
+            roundabout = bool(self.edge_roundabout[eid])
+            start_bearing = bearing(*points[0], *points[1]) if len(points) > 1 else prev_bearing
+
+            if prev_name is None:
+                current["name"] = name
+            elif roundabout and in_roundabout:
+                current["maneuver"]["exit"] += 1
+            elif roundabout:
+                steps.append(current)
+                current = {"maneuver": {"type": "roundabout", "exit": 1}, "name": name, "distance": 0.0, "duration": 0.0}
+            elif in_roundabout:
+                # Ra khỏi vòng xuyến: bước vòng xuyến mang tên đường ra
+                current["name"] = name
+            else:
+                angle = ((start_bearing - prev_bearing + 180) % 360) - 180 if start_bearing is not None and prev_bearing is not None else 0
+                modifier = turn_modifier(angle)
+                if name != prev_name or modifier != "straight":
+                    steps.append(current)
+                    m_type = "new name" if modifier == "straight" else "turn"
+                    current = {"maneuver": {"type": m_type, "modifier": modifier}, "name": name,
+                               "distance": 0.0, "duration": 0.0}
+
+            current["distance"] += self.edge_length[eid]
+            current["duration"] += duration
+            in_roundabout = roundabout
+            prev_name = name
+            if len(points) > 1:
+                prev_bearing = bearing(*points[-2], *points[-1])
+
+        steps.append(current)
+        steps.append({"maneuver": {"type": "arrive"}, "name": "", "distance": 0.0, "duration": 0.0})
+        return steps
+
+    def route(self, start_lat, start_lon, end_lat, end_lon, mode="driving"):
+        """Trả về (path, distance, duration, steps_raw) cùng dạng OSRM, hoặc None nếu không tìm được."""
+        profile = self.profiles.get(PROFILES.get(mode, "car"))
+        if profile is None: return None
+        source = self.nearest_node(profile, start_lat, start_lon)
+        target = self.nearest_node(profile, end_lat, end_lon)
+        if source is None or target is None: return None
+
+        legs = self.astar(profile, source, target)
+        if legs is None: return None
+
+        path = [[start_lat, start_lon]]
+        for i, (ref, _) in enumerate(legs):
+            # Điểm đầu mỗi cạnh trùng điểm cuối cạnh trước
+            points = self.edge_points(ref)[0 if i == 0 else 1:]
+            path.extend([lat, lon] for lat, lon in points)
+        path.append([end_lat, end_lon])
+
+        distance = sum(self.edge_length[ref >> 1] for ref, _ in legs)
+        duration = sum(w for _, w in legs)
+        return path, distance, duration, self.build_steps(legs)
+
+    def travel_matrix(self, start_lat, start_lon, destinations, mode="driving"):
+        """Một lần Dijkstra từ điểm xuất phát tới mọi điểm đích: ([m], [s]), None nếu không tới được.
+
+        Trả về (None, None) khi điểm xuất phát cách đồ thị quá MAX_SNAP_DISTANCE.
+        """
+        profile = self.profiles.get(PROFILES.get(mode, "car"))
+        if profile is None: return None, None
+        source = self.nearest_node(profile, start_lat, start_lon)
+        # Điểm xuất phát ngoài vùng đồ thị: để người gọi chuyển sang OSRM như route()
+        if source is None: return None, None
+        wanted = {}
+        for i, (lat, lon) in enumerate(destinations):
+            node = self.nearest_node(profile, lat, lon)
+            if node is not None:
+                wanted.setdefault(node, []).append(i)
+
+        offsets, targets, refs, weights = profile.offsets, profile.targets, profile.refs, profile.weights
+        best = {source: (0.0, 0.0)}
+        heap = [(0.0, 0.0, source)]
+        distances = [None] * len(destinations)
+        durations = [None] * len(destinations)
+        remaining = len(wanted)
+        done = set()
+        while heap and remaining:
+            g, d, u = heapq.heappop(heap)
+            if u in done: continue
+            done.add(u)
+            if u in wanted:
+                for i in wanted[u]:
+                    distances[i], durations[i] = d, g
+                remaining -= 1
+            for i in range(offsets[u], offsets[u + 1]):
+                v = targets[i]
+                ng = g + weights[i]
+                if v not in done and ng < best.get(v, (math.inf,))[0]:
+                    nd = d + self.edge_length[refs[i] >> 1]
+                    best[v] = (ng, nd)
+                    heapq.heappush(heap, (ng, nd, v))
+        return distances, durations
+
+
+# --- ĐỌC FILE OSM ---
+def read_osm_xml(path):
+    from services.osm_import import iter_xml_objects
+    ways = []
+    needed = set()
+    for kind, _, tags, refs in iter_xml_objects(path, []):
+        if kind == "way" and tags.get("highway") in ROUTABLE:
+            ways.append((array("q", refs), {k: tags[k] for k in ROUTE_TAGS if k in tags}))
+            needed.update(refs)
+    coords = {}
+    for kind, attrib, _, _ in iter_xml_objects(path, []):
+        if kind == "node":
+            node_id = int(attrib["id"])
+            if node_id in needed:
+                coords[node_id] = (float(attrib["lat"]), float(attrib["lon"]))
+    return ways, coords
+
+
+def read_osm_pbf(path):
+    try:
+        import osmium
+    except ImportError:
+        raise SystemExit("Cần cài pyosmium để đọc .osm.pbf: pip install osmium")
+    ways = []
+    coords = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        index = f"sparse_file_array,{os.path.join(tmp, 'nodes.idx')}"
+        for obj in osmium.FileProcessor(path, osmium.osm.WAY).with_locations(index):
+            tags = dict(obj.tags)
+            if tags.get("highway") not in ROUTABLE: continue
+            refs = array("q")
+            for n in obj.nodes:
+                if not n.location.valid(): continue
+                refs.append(n.ref)
+                coords[n.ref] = (n.lat, n.lon)
+            ways.append((refs, {k: tags[k] for k in ROUTE_TAGS if k in tags}))
+    return ways, coords
+
+
+ROUTE_TAGS = ("highway", "name", "oneway", "junction", "access", "motor_vehicle", "bicycle", "foot", "oneway:bicycle")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dựng đồ thị đường cho bộ định tuyến offline")
+    parser.add_argument("path", help="File OSM (.osm/.xml hoặc .osm.pbf)")
+    parser.add_argument("--out", default=LOCAL_ROUTER_GRAPH, help="File đồ thị đầu ra")
+    args = parser.parse_args(argv)
+
+    started = time.time()
+    reader = read_osm_pbf if args.path.lower().endswith(".pbf") else read_osm_xml
+    ways, coords = reader(args.path)
+    router = LocalRouter.build(ways, coords)
+    router.save(args.out)
+    print(f"Đồ thị: {len(router.lats)} nút giao, {len(router.edge_length)} cạnh, "
+          f"{time.time() - started:.1f}s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+# osm_import.py
+"""Nhập dữ liệu OSM offline vào kho POI để tìm kiếm không cần gọi Overpass.
+
+Cách dùng:
+    python -m services.osm_import ho-chi-minh.osm.pbf
+    python -m services.osm_import ho-chi-minh.osm --store data/poi_store.sqlite3
+    python -m services.osm_import overpass_dump.json
+
+File được đọc tuần tự, chỉ giữ POI ăn uống (cùng điều kiện amenity/shop/cuisine với
+truy vấn Overpass) dưới dạng bản ghi POI gọn, ghi theo lô nên bộ nhớ không tăng theo
+kích thước file. Tên địa danh (place=*) và tên đường trong file cũng được lưu để gợi ý
+địa điểm khi người dùng gõ vị trí. Các ô bản đồ trong vùng dữ liệu được đánh dấu source='import' và
+không hết hạn, nên osm_service sẽ dùng kho thay vì Overpass cho những ô này.
+"""
+import argparse
+import os
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from config.config import POI_STORE_PATH, OSM_TILE_ZOOM
+from services.osm_service import build_place, is_food_tags
+from services.poi_store import POIStore
+from services.place_index import PlaceAggregator
+from utils.geo import tiles_in_bbox
+from utils.json_stream import iter_array_items, iter_file_chunks
+
+
+def make_element(osm_type, osm_id, lat, lon, tags):
+    return {"type": osm_type, "id": osm_id, "lat": lat, "lon": lon, "tags": tags}
+
+
+# Địa danh và loại đường có tên dùng cho gợi ý địa điểm
+PLACE_TYPES = {"city", "town", "village", "suburb", "quarter", "neighbourhood", "hamlet"}
+STREET_TYPES = {"motorway", "trunk", "primary", "secondary", "tertiary", "unclassified",
+                "residential", "living_street", "service", "pedestrian"}
+
+
+def place_name_kind(tags):
+    """Loại tên cần lưu cho gợi ý ("place"/"street"), None nếu không cần."""
+    if not tags.get('name'): return None
+    if tags.get('place') in PLACE_TYPES: return "place"
+    if tags.get('highway') in STREET_TYPES: return "street"
+    return None
+
+
+def add_place_name(names, tags, lat, lon):
+    """Một con đường gồm nhiều way: PlaceAggregator lấy trung bình điểm giữa các way gần nhau."""
+    names.add(tags['name'], place_name_kind(tags), lat, lon)
+
+
+def bbox_center(points):
+    """Tâm bbox của các điểm, giống "out center" của Overpass."""
+    lats = [p[0] for p in points]
+    lons = [p[1] for p in points]
+    return (min(lats) + max(lats)) / 2, (min(lons) + max(lons)) / 2
+
+
+# --- OVERPASS JSON ---
+def iter_json_dump(path, bounds, names):
+    for el in iter_array_items(iter_file_chunks(path)):
+        tags = el.get('tags') or {}
+        if not is_food_tags(tags): continue
+
+        lat = el.get('lat') or el.get('center', {}).get('lat')
+        lon = el.get('lon') or el.get('center', {}).get('lon')
+        if (lat is None or lon is None) and el.get('geometry'):
+            lat, lon = bbox_center([(g['lat'], g['lon']) for g in el['geometry'] if g])
+        if lat is None or lon is None: continue
+        yield make_element(el.get('type', 'node'), el['id'], lat, lon, tags)
+
+
+# --- OSM XML ---
+def iter_xml_objects(path, bounds):
+    """Duyệt node/way của file .osm, dọn cây XML sau mỗi phần tử để bộ nhớ không tăng."""
+    context = ET.iterparse(path, events=("start", "end"))
+    _, root = next(context)
+    for event, elem in context:
+        if event != "end": continue
+        if elem.tag == "bounds":
+            bounds[:] = [float(elem.get(k)) for k in ("minlat", "minlon", "maxlat", "maxlon")]
+        elif elem.tag in ("node", "way"):
+            tags = {t.get('k'): t.get('v') for t in elem.iter('tag')}
+            refs = [int(nd.get('ref')) for nd in elem.iter('nd')] if elem.tag == "way" else None
+            yield elem.tag, elem.attrib, tags, refs
+        if elem.tag in ("node", "way", "relation", "bounds"):
+            root.clear()
+
+
+def iter_osm_xml(path, bounds, names):
+    # Lượt 1: chỉ ghi nhớ id các node thuộc way ăn uống (cần để tính tâm way)
+    # và node giữa của các đường có tên
+    needed = set()
+    for kind, _, tags, refs in iter_xml_objects(path, bounds):
+        if kind != "way": continue
+        if is_food_tags(tags):
+            needed.update(refs)
+        elif refs and place_name_kind(tags):
+            needed.add(refs[len(refs) // 2])
+
+    # Lượt 2: node đến trước way trong file .osm nên tọa độ luôn sẵn khi gặp way
+    coords = {}
+    for kind, attrib, tags, refs in iter_xml_objects(path, bounds):
+        if kind == "node":
+            node_id = int(attrib['id'])
+            lat, lon = float(attrib['lat']), float(attrib['lon'])
+            if node_id in needed:
+                coords[node_id] = (lat, lon)
+            if is_food_tags(tags):
+                yield make_element("node", node_id, lat, lon, tags)
+            elif place_name_kind(tags):
+                add_place_name(names, tags, lat, lon)
+        elif is_food_tags(tags):
+            points = [coords[r] for r in refs if r in coords]
+            if not points: continue
+            lat, lon = bbox_center(points)
+            yield make_element("way", int(attrib['id']), lat, lon, tags)
+        elif refs and place_name_kind(tags) and refs[len(refs) // 2] in coords:
+            add_place_name(names, tags, *coords[refs[len(refs) // 2]])
+
+
+# --- OSM PBF (cần pyosmium, không bắt buộc cho ứng dụng) ---
+def iter_osm_pbf(path, bounds, names):
+    try:
+        import osmium
+    except ImportError:
+        raise SystemExit("Cần cài pyosmium để đọc .osm.pbf: pip install osmium")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Chỉ mục tọa độ node nằm trên đĩa thay vì RAM
+        index = f"sparse_file_array,{os.path.join(tmp, 'nodes.idx')}"
+        fp = osmium.FileProcessor(path).with_locations(index)
+        box = fp.header.box()
+        if box.valid():
+            bounds[:] = [box.bottom_left.lat, box.bottom_left.lon, box.top_right.lat, box.top_right.lon]
+
+        for obj in fp:
+            if obj.is_relation(): continue
+            tags = dict(obj.tags)
+            if not is_food_tags(tags):
+                if place_name_kind(tags):
+                    nodes = [obj.location] if obj.is_node() else [n.location for n in obj.nodes]
+                    loc = nodes[len(nodes) // 2] if nodes else None
+                    if loc is not None and loc.valid():
+                        add_place_name(names, tags, loc.lat, loc.lon)
+                continue
+            if obj.is_node():
+                if not obj.location.valid(): continue
+                yield make_element("node", obj.id, obj.location.lat, obj.location.lon, tags)
+            else:
+                points = [(n.lat, n.lon) for n in obj.nodes if n.location.valid()]
+                if not points: continue
+                lat, lon = bbox_center(points)
+                yield make_element("way", obj.id, lat, lon, tags)
+
+
+def detect_reader(path):
+    name = path.lower()
+    if name.endswith(".pbf"): return iter_osm_pbf
+    if name.endswith((".osm", ".xml")): return iter_osm_xml
+    if name.endswith(".json"): return iter_json_dump
+    raise SystemExit(f"Không nhận dạng được định dạng file: {path}")
+
+
+def import_file(path, store, zoom=OSM_TILE_ZOOM, batch_size=2000):
+    """Nhập một file OSM vào kho, trả về (số POI, số ô đã đánh dấu)."""
+    reader = detect_reader(path)
+    bounds = []
+    names = PlaceAggregator()
+    seen = (float("inf"), float("inf"), float("-inf"), float("-inf"))
+    count = 0
+    batch = []
+
+    for el in reader(path, bounds, names):
+        place = build_place(el)
+        if not place: continue
+        batch.append(place)
+        count += 1
+        lat, lon = place.lat, place.lon
+        seen = (min(seen[0], lat), min(seen[1], lon), max(seen[2], lat), max(seen[3], lon))
+        if len(batch) >= batch_size:
+            store.insert_places(batch)
+            batch = []
+    if batch:
+        store.insert_places(batch)
+    store.save_places(names.rows())
+
+    # Ưu tiên bbox khai báo trong file; JSON không có thì dùng bbox các POI đã đọc
+    south, west, north, east = bounds if bounds else seen
+    if not count and not bounds: return 0, 0
+    tiles = [(zoom, x, y) for x, y in tiles_in_bbox(south, west, north, east, zoom)]
+    store.mark_tiles(tiles, source="import")
+    return count, len(tiles)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Nhập dữ liệu OSM (.osm.pbf/.osm/.json Overpass) vào kho POI offline")
+    parser.add_argument("path", help="File OSM cần nhập")
+    parser.add_argument("--store", default=POI_STORE_PATH, help="Đường dẫn file SQLite của kho POI")
+    parser.add_argument("--batch-size", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    if not args.store:
+        raise SystemExit("Chưa cấu hình POI_STORE_PATH, hãy truyền --store")
+
+    started = time.time()
+    store = POIStore(args.store, OSM_TILE_ZOOM)
+    try:
+        count, tiles = import_file(args.path, store, batch_size=args.batch_size)
+    finally:
+        store.close()
+    print(f"Đã nhập {count} POI, đánh dấu {tiles} ô trong {time.time() - started:.1f}s -> {args.store}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,53 +1,289 @@
 #  osm_service.py
-import requests
+import re
+from concurrent.futures import TimeoutError as FutureTimeout
 import streamlit as st
 from geopy.geocoders import Nominatim
-from unidecode import unidecode
-import re
 from services.search_engine import expand_search_query_smart, normalize_text
+from services.keyword_matcher import KeywordMatcher
+from services.ttl_cache import TTLCache
+from services.poi_store import POIStore
+from services.poi import POI
+from services.geocoder import GeocodeCache, GeocodeQueue
+from services.place_index import PlaceIndexRefresher
+from services.single_flight import SingleFlight
+from services.http_client import get_http_session
+from utils.json_stream import iter_array_items
+from utils.geo import distances_to, latlon_to_tile, tile_bounds, tiles_covering
+from config.config import (
+    OSM_FETCH_MODE, OSM_TILE_ZOOM, OSM_TILE_CACHE_SIZE, OSM_TILE_TTL, POI_STORE_PATH, POI_STORE_MAX_AGE,
+    GEOCODE_CACHE_PATH, GEOCODE_CACHE_TTL, GEOCODE_NEGATIVE_TTL, GEOCODE_MIN_INTERVAL, GEOCODE_WAIT,
+    PLACE_INDEX_TTL, PLACE_SUGGEST_LIMIT
+)
 
-def geocode(q: str):
-    g = Nominatim(user_agent="my_food_app_v4_multi_search") 
-    try:
+OVERPASS_URL = "http://overpass-api.de/api/interpreter"
+FOOD_AMENITIES = "restaurant|fast_food|cafe|bar|pub|ice_cream|food_court|street_vendor|biergarten"
+FOOD_SHOPS = "bakery|pastry|beverages|food|convenience|deli|greengrocer|seafood|supermarket|mall"
+FOOD_AMENITY_RE = re.compile(FOOD_AMENITIES)
+FOOD_SHOP_RE = re.compile(FOOD_SHOPS)
+
+def is_food_tags(tags):
+    """Cùng điều kiện với nhóm all_food của truy vấn Overpass (regex không neo như ["amenity"~"..."])."""
+    return bool(
+        FOOD_AMENITY_RE.search(tags.get('amenity', ''))
+        or FOOD_SHOP_RE.search(tags.get('shop', ''))
+        or 'cuisine' in tags
+    )
+
+@st.cache_resource
+def get_geocode_cache():
+    return GeocodeCache(GEOCODE_CACHE_PATH, GEOCODE_CACHE_TTL, GEOCODE_NEGATIVE_TTL)
+
+@st.cache_resource
+def get_geocode_queue():
+    # Một client Nominatim và một hàng đợi cho cả tiến trình: không vượt 1 request/giây dù nhiều người dùng
+    g = Nominatim(user_agent="my_food_app_v4_multi_search")
+
+    def lookup(q):
         loc = g.geocode(q, exactly_one=True, addressdetails=True, language="vi")
         if not loc: return None
         return {"name": loc.address, "lat": loc.latitude, "lon": loc.longitude}
-    except Exception:
+
+    return GeocodeQueue(lookup, get_geocode_cache(), GEOCODE_MIN_INTERVAL)
+
+def geocode_key(q):
+    """Khóa cache: không dấu, chữ thường, gộp khoảng trắng ("Đại học  KHTN" == "dai hoc khtn")."""
+    return " ".join(normalize_text(q).split())
+
+def load_place_names():
+    store = get_poi_store()
+    return store.place_names() if store else []
+
+@st.cache_resource
+def get_place_refresher():
+    # Dựng lại ở luồng nền mỗi PLACE_INDEX_TTL giây để quán/đường mới vào kho cũng được gợi ý,
+    # ô gợi ý không phải chờ lúc dựng
+    return PlaceIndexRefresher(load_place_names, PLACE_INDEX_TTL)
+
+def get_place_index():
+    return get_place_refresher().get()
+
+def suggest_places(text, limit=PLACE_SUGGEST_LIMIT):
+    """Gợi ý địa điểm cho chuỗi đang gõ, chỉ tra chỉ mục trong bộ nhớ."""
+    return get_place_index().suggest(text, limit)
+
+@st.cache_resource
+def get_osm_flight():
+    # Nhiều người cùng tìm một lúc (giờ trưa, cùng trường) chỉ tạo một request Overpass/Nominatim mỗi truy vấn
+    return SingleFlight()
+
+def geocode(q: str):
+    key = geocode_key(q or "")
+    if not key: return None
+    # Tên đã biết (địa danh, đường, quận, tên quán trong kho) thì không cần gọi Nominatim
+    known = get_place_index().resolve(q)
+    if known: return known
+    hit, result = get_geocode_cache().get(key)
+    if hit: return result
+    return get_osm_flight().do(("geocode", key), wait_geocode, key, q)
+
+def wait_geocode(key, q):
+    try:
+        return get_geocode_queue().submit(key, q).result(timeout=GEOCODE_WAIT)
+    except FutureTimeout:
         return None
 
-def check_strict_match(text, keywords):
-    if not text: return False
-    text_norm = normalize_text(str(text)) 
-    
-    for kw in keywords:
-        kw_clean = normalize_text(kw)
-        if not kw_clean: continue
-        
-        if len(kw_clean) <= 2:
-            pattern = r"\b" + re.escape(kw_clean) + r"\b"
-            if re.search(pattern, text_norm):
-                return True
-        else:
-            if kw_clean in text_norm:
-                return True
-    return False
+def build_keyword_matchers(keywords):
+    """Dựng automaton một lần cho mỗi truy vấn thay vì so từng từ khóa với từng địa điểm.
+
+    - tag_matcher: so khớp chuỗi con trên cuisine/dish (chữ thường)
+    - name_matcher: so khớp trên tên đã chuẩn hóa, từ khóa <= 2 ký tự phải đứng thành từ riêng
+    """
+    tag_matcher = KeywordMatcher(kw.lower() for kw in keywords)
+    name_matcher = KeywordMatcher((normalize_text(kw) for kw in keywords), boundary_max_len=2)
+    return tag_matcher, name_matcher
+
+def is_matching_place(place, matchers):
+    tag_matcher, name_matcher = matchers
+    if tag_matcher.search(place.cuisine.lower()) or tag_matcher.search(place.dish.lower()):
+        return True
+    return bool(place.name) and name_matcher.search(normalize_text(place.name))
+
+def build_place(el):
+    """Chuyển phần tử OSM (node/way có lat/lon hoặc center) thành POI; None nếu không có tọa độ."""
+    tags = el.get('tags', {})
+    house = tags.get('addr:housenumber', '')
+    street = tags.get('addr:street', '')
+    district = tags.get('addr:district', '')
+
+    address_parts = [p for p in [house, street, district] if p]
+    full_address = ", ".join(address_parts) if address_parts else tags.get('address', 'Đang cập nhật địa chỉ')
+
+    item_lat = el.get('lat') or el.get('center', {}).get('lat')
+    item_lon = el.get('lon') or el.get('center', {}).get('lon')
+
+    if item_lat and item_lon:
+        return POI(
+            id=el.get('id'), osm_type=el.get('type', 'node'), name=tags.get('name', ''),
+            lat=item_lat, lon=item_lon, address=full_address,
+            cuisine=tags.get('cuisine', ''), dish=tags.get('dish', ''), amenity=tags.get('amenity', ''),
+        )
+    return None
+
+class OverpassError(RuntimeError):
+    """Overpass trả HTTP 200 nhưng truy vấn không chạy xong (timeout/hết bộ nhớ), dữ liệu thiếu."""
+
+
+def iter_overpass_places(response):
+    """Đọc phản hồi Overpass theo luồng, lọc trùng và chuyển từng phần tử thành POI ngay khi đọc xong.
+
+    Bộ nhớ đỉnh chỉ gồm các POI gọn, không phải toàn bộ payload JSON. Khi Overpass báo
+    "remark": "runtime error: ..." (thường ở cuối phản hồi) thì raise OverpassError sau khi
+    đọc hết, để người gọi không cache kết quả rỗng/thiếu.
+    """
+    seen_ids = set()
+    others = {}
+    for el in iter_array_items(response.iter_content(chunk_size=1 << 16), others=others):
+        el_id = el.get('id')
+        if el_id in seen_ids: continue
+        seen_ids.add(el_id)
+        place = build_place(el)
+        if place:
+            yield place
+    remark = others.get('remark') or ""
+    if remark.startswith("runtime error"):
+        raise OverpassError(remark)
+
+# --- CHẾ ĐỘ "area": cache POI theo từng ô bản đồ, không phụ thuộc món cần tìm ---
+@st.cache_resource
+def get_tile_cache():
+    # Dùng chung cho mọi session: người dùng ở gần nhau / đổi bán kính sẽ trúng cache ô cũ
+    return TTLCache(maxsize=OSM_TILE_CACHE_SIZE, ttl=OSM_TILE_TTL)
 
+@st.cache_resource
+def get_tile_flight():
+    # Gộp theo từng ô: hai vòng tìm kiếm chồng lên nhau (khác tâm/bán kính/từ khóa) chỉ tải phần chung một lần
+    return SingleFlight()
+
+@st.cache_resource
+def get_poi_store():
+    if not POI_STORE_PATH: return None
+    try:
+        return POIStore(POI_STORE_PATH, OSM_TILE_ZOOM)
+    except Exception as e:
+        print(f"Không mở được kho POI: {e}")
+        return None
+
+def merge_tile_rows(tiles, zoom):
+    """Gộp các ô liền nhau trên cùng hàng thành một bbox để truy vấn gọn hơn."""
+    bboxes = []
+    for y in sorted({y for _, y in tiles}):
+        xs = sorted(x for x, ty in tiles if ty == y)
+        run_start = prev = xs[0]
+        for x in xs[1:] + [None]:
+            if x is not None and x == prev + 1:
+                prev = x
+                continue
+            south, west, _, _ = tile_bounds(run_start, y, zoom)
+            _, _, north, east = tile_bounds(prev, y, zoom)
+            bboxes.append((south, west, north, east))
+            if x is not None:
+                run_start = prev = x
+    return bboxes
+
+def fetch_tiles(tiles, zoom):
+    """Tải POI ăn uống cho các ô còn thiếu trong MỘT truy vấn Overpass, trả về dict ô -> places.
+
+    Mỗi POI được gán vào ô chứa tọa độ của nó; ô không có POI vẫn được trả về (list rỗng)
+    để cache lại. Lỗi mạng và lỗi runtime của Overpass được raise để không cache kết quả rỗng.
+    """
+    statements = []
+    for south, west, north, east in merge_tile_rows(tiles, zoom):
+        bbox = f"{south:.7f},{west:.7f},{north:.7f},{east:.7f}"
+        statements.append(f'nwr({bbox})["amenity"~"{FOOD_AMENITIES}"];')
+        statements.append(f'nwr({bbox})["shop"~"{FOOD_SHOPS}"];')
+        statements.append(f'nwr({bbox})["cuisine"];')
+    ql_query = "[out:json][timeout:60];\n(\n" + "\n".join(statements) + "\n);\nout center;"
+
+    by_tile = {tile: [] for tile in tiles}
+    with get_http_session().post(OVERPASS_URL, data={'data': ql_query}, timeout=30, stream=True) as response:
+        response.raise_for_status()
+        for place in iter_overpass_places(response):
+            tile = latlon_to_tile(place.lat, place.lon, zoom)
+            if tile in by_tile:
+                by_tile[tile].append(place)
+    return by_tile
+
+def load_area_places(lat, lon, radius):
+    """Toàn bộ POI ăn uống trong các ô phủ vòng tìm kiếm.
+
+    Thứ tự tra: cache RAM -> kho SQLite trên đĩa -> Overpass (chỉ các ô còn thiếu, ghi ngược vào kho).
+    """
+    cache = get_tile_cache()
+    store = get_poi_store()
+    zoom = OSM_TILE_ZOOM
+    tiles = [(zoom, x, y) for x, y in tiles_covering(lat, lon, radius, zoom)]
+
+    found = cache.get_many(tiles)
+    missing = [tile for tile in tiles if tile not in found]
+
+    if missing and store:
+        try:
+            stored = store.load_tiles(missing, POI_STORE_MAX_AGE)
+        except Exception as e:
+            print(f"Lỗi đọc kho POI: {e}")
+            stored = {}
+        cache.set_many(stored)
+        found.update(stored)
+        missing = [tile for tile in missing if tile not in stored]
+
+    if missing:
+        found.update(get_tile_flight().do_many(missing, fetch_and_store_tiles))
+
+    return [place for tile in tiles for place in found[tile]]
+
+def fetch_and_store_tiles(tiles):
+    """Tải các ô (zoom, x, y) từ Overpass rồi ghi vào cache RAM và kho; chỉ leader của lô gọi."""
+    cache = get_tile_cache()
+    # Ô có thể vừa được lượt khác tải xong giữa lúc tra cache và lúc nhận lô
+    done = cache.get_many(tiles)
+    missing = [tile for tile in tiles if tile not in done]
+    if not missing: return done
+    zoom = missing[0][0]
+    # fetch_tiles raise khi Overpass lỗi/timeout (kể cả HTTP 200 kèm remark), nên chỉ kết quả
+    # đầy đủ mới tới được cache RAM và kho
+    fetched = {(zoom, x, y): places for (x, y), places in fetch_tiles([(x, y) for _, x, y in missing], zoom).items()}
+    cache.set_many(fetched)
+    store = get_poi_store()
+    if store:
+        try:
+            store.save_tiles(fetched)
+        except Exception as e:
+            print(f"Lỗi ghi kho POI: {e}")
+    return {**done, **fetched}
+
+def search_area_places(lat, lon, radius, user_query):
+    try:
+        places = load_area_places(lat, lon, radius)
+    except Exception as e:
+        print(f"Lỗi kết nối OSM: {e}")
+        return []
+
+    matchers = build_keyword_matchers(expand_search_query_smart(user_query))
+    in_radius = distances_to(lat, lon, places) <= radius
+    return [p for p, inside in zip(places, in_radius.tolist()) if inside and is_matching_place(p, matchers)]
+
+# --- CHẾ ĐỘ "query": lọc món ngay trên Overpass ---
 @st.cache_data(ttl=3600, show_spinner=False)
-def get_restaurants_from_osm(lat, lon, radius, user_query):
-    overpass_url = "http://overpass-api.de/api/interpreter"
-    
+def query_restaurants_from_osm(lat, lon, radius, user_query):
     search_keywords = expand_search_query_smart(user_query)
     
     search_term_osm = "|".join(search_keywords)
 
-    food_amenities = "restaurant|fast_food|cafe|bar|pub|ice_cream|food_court|street_vendor|biergarten"
-    food_shops = "bakery|pastry|beverages|food|convenience|deli|greengrocer|seafood|supermarket|mall"
-
     ql_query = f"""
     [out:json][timeout:60];
     (
-      nwr(around:{radius},{lat},{lon})["amenity"~"{food_amenities}"];
-      nwr(around:{radius},{lat},{lon})["shop"~"{food_shops}"];
+      nwr(around:{radius},{lat},{lon})["amenity"~"{FOOD_AMENITIES}"];
+      nwr(around:{radius},{lat},{lon})["shop"~"{FOOD_SHOPS}"];
       nwr(around:{radius},{lat},{lon})["cuisine"]; 
     )->.all_food;
     
@@ -65,54 +301,23 @@ def get_restaurants_from_osm(lat, lon, radius, user_query):
     out center;
     """
     
+    # Lỗi được raise ra ngoài: st.cache_data không cache exception, nên lần sau còn thử lại
+    with get_http_session().get(OVERPASS_URL, params={'data': ql_query}, timeout=20, stream=True) as response:
+        response.raise_for_status()
+        matchers = build_keyword_matchers(search_keywords)
+        return [p for p in iter_overpass_places(response) if is_matching_place(p, matchers)]
+
+def get_restaurants_from_osm(lat, lon, radius, user_query):
+    if OSM_FETCH_MODE == "area":
+        # Chế độ ô đã gộp theo từng ô trong load_area_places; phần còn lại là lọc trên RAM
+        return search_area_places(lat, lon, radius, user_query)
+    # st.cache_data chỉ có tác dụng sau khi lần gọi đầu xong; các lần gọi trùng trong lúc chờ thì gộp lại
+    key = ("osm", lat, lon, radius, user_query)
+    return get_osm_flight().do(key, fetch_restaurants_from_osm, lat, lon, radius, user_query)
+
+def fetch_restaurants_from_osm(lat, lon, radius, user_query):
     try:
-        response = requests.get(overpass_url, params={'data': ql_query}, timeout=20)
-        if response.status_code == 200:
-            data = response.json()
-            elements = data.get('elements', [])
-            
-            results = []
-            seen_ids = set()
-            
-            for el in elements:
-                el_id = el.get('id')
-                if el_id in seen_ids: continue
-                
-                tags = el.get('tags', {})
-                name = tags.get('name', '')
-                cuisine = tags.get('cuisine', '')
-                dish = tags.get('dish', '')
-
-                is_match = False
-                for kw in search_keywords:
-                    if kw.lower() in cuisine.lower() or kw.lower() in dish.lower():
-                        is_match = True
-                        break
-                
-                if not is_match:
-                    if check_strict_match(name, search_keywords):
-                        is_match = True
-                
-                if is_match:
-                    seen_ids.add(el_id)
-                    house = tags.get('addr:housenumber', '')
-                    street = tags.get('addr:street', '')
-                    district = tags.get('addr:district', '')
-                    
-                    address_parts = [p for p in [house, street, district] if p]
-                    full_address = ", ".join(address_parts) if address_parts else tags.get('address', 'Đang cập nhật địa chỉ')
-                    
-                    el['address'] = full_address
-                    item_lat = el.get('lat') or el.get('center', {}).get('lat')
-                    item_lon = el.get('lon') or el.get('center', {}).get('lon')
-                    
-                    if item_lat and item_lon:
-                        el['lat'] = item_lat
-                        el['lon'] = item_lon
-                        results.append(el)
-                    
-            return results
-        return []
+        return query_restaurants_from_osm(lat, lon, radius, user_query)
     except Exception as e:
         print(f"Lỗi kết nối OSM: {e}")
-        return []
\ No newline at end of file
+        return []
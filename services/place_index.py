@@ -0,0 +1,143 @@
+# place_index.py
+import bisect
+import threading
+import time
+from services.search_engine import normalize_text
+from utils.geo import haversine_m
+
+# Thứ tự ưu tiên khi gợi ý: địa danh lớn trước, tên quán sau
+KIND_ORDER = {"place": 0, "district": 1, "street": 2, "poi": 3}
+# Số khóa tối đa quét cho một tiền tố (tiền tố quá ngắn có thể khớp cả chục nghìn tên)
+MAX_SCAN = 2000
+# Đường cùng tên ở nhiều nơi (TP.HCM có nhiều "Lê Lợi"): gom điểm theo ô ~1 km thay vì lấy trung bình cả thành phố
+STREET_CELL_DEG = 0.01
+# Tên chỉ được quy ra tọa độ offline khi mọi nơi mang tên đó nằm trong bán kính này
+RESOLVE_SPREAD_M = 1500
+
+
+def place_key(text):
+    """Khóa so khớp: bỏ dấu, chữ thường, gộp khoảng trắng ("Quận  1" -> "quan 1")."""
+    return " ".join(normalize_text(text).split())
+
+
+class PlaceAggregator:
+    """Cộng dồn tọa độ theo tên để lấy vị trí đại diện (trung bình các điểm).
+
+    Đường được gom thêm theo ô STREET_CELL_DEG, nên hai con đường trùng tên ở hai quận là hai
+    mục riêng chứ không bị gộp thành một điểm giữa không nằm trên đường nào.
+    """
+
+    def __init__(self):
+        self.groups = {}
+
+    def add(self, name, kind, lat, lon):
+        cell = (round(lat / STREET_CELL_DEG), round(lon / STREET_CELL_DEG)) if kind == "street" else (0, 0)
+        acc = self.groups.setdefault((name, kind, *cell), [0.0, 0.0, 0])
+        acc[0] += lat
+        acc[1] += lon
+        acc[2] += 1
+
+    def rows(self):
+        """Các bộ (name, kind, cy, cx, lat, lon, weight)."""
+        return [(name, kind, cy, cx, lat / n, lon / n, n) for (name, kind, cy, cx), (lat, lon, n) in self.groups.items()]
+
+
+class PlaceIndex:
+    """Chỉ mục tiền tố trên tên địa điểm đã biết (địa danh, quận, đường, tên quán) để gợi ý khi gõ.
+
+    Mỗi tên được đánh chỉ mục tại mọi đầu từ ("dai hoc khoa hoc tu nhien", "hoc khoa hoc tu nhien",
+    "khoa hoc tu nhien"...) trong một mảng khóa đã sắp xếp; tìm tiền tố là hai lần bisect, nên gõ
+    "khoa hoc" cũng ra "Đại học Khoa học Tự nhiên". So khớp không phân biệt dấu.
+    """
+
+    def __init__(self, entries):
+        """entries: các bộ (name, kind, lat, lon, weight)."""
+        self.places = []
+        self.exact = {}
+        keys = []
+        for name, kind, lat, lon, weight in entries:
+            key = place_key(name)
+            if not key: continue
+            idx = len(self.places)
+            self.places.append((name, kind, lat, lon, weight))
+            self.exact.setdefault(key, []).append(idx)
+            words = key.split()
+            keys.extend((" ".join(words[i:]), i, idx) for i in range(len(words)))
+        keys.sort()
+        self.keys = [k for k, _, _ in keys]
+        self.refs = [(pos, idx) for _, pos, idx in keys]
+
+    def __len__(self):
+        return len(self.places)
+
+    def rank(self, idx, pos=0):
+        name, kind, _, _, weight = self.places[idx]
+        # Khớp ở đầu tên trước, rồi theo loại, độ phổ biến (số quán), tên ngắn
+        return pos > 0, KIND_ORDER.get(kind, len(KIND_ORDER)), -weight, len(name)
+
+    def suggest(self, text, limit=8):
+        """Tối đa limit gợi ý (name, kind, lat, lon) cho chuỗi đang gõ, tốt nhất trước."""
+        prefix = place_key(text)
+        if not prefix: return []
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = min(bisect.bisect_left(self.keys, prefix + "\uffff"), lo + MAX_SCAN)
+
+        matches = {}
+        for pos, idx in self.refs[lo:hi]:
+            matches[idx] = min(pos, matches.get(idx, pos))
+        suggestions, seen = [], set()
+        for idx in sorted(matches, key=lambda i: self.rank(i, matches[i])):
+            name, kind, lat, lon, _ = self.places[idx]
+            if place_key(name) in seen: continue
+            seen.add(place_key(name))
+            suggestions.append((name, kind, lat, lon))
+            if len(suggestions) >= limit: break
+        return suggestions
+
+    def resolve(self, text):
+        """Tọa độ của tên đã biết (khớp đúng cả tên, không phân biệt dấu): {"name", "lat", "lon"}.
+
+        None nếu chưa biết tên, hoặc tên có ở nhiều nơi cách nhau quá RESOLVE_SPREAD_M (đường trùng
+        tên, chuỗi quán nhiều chi nhánh): khi đó để Nominatim quyết định.
+        """
+        matches = self.exact.get(place_key(text))
+        if not matches: return None
+        best = min(matches, key=self.rank)
+        name, _, lat, lon, _ = self.places[best]
+        if any(haversine_m(lat, lon, self.places[i][2], self.places[i][3]) > RESOLVE_SPREAD_M for i in matches):
+            return None
+        return {"name": name, "lat": lat, "lon": lon}
+
+
+class PlaceIndexRefresher:
+    """Giữ một PlaceIndex và dựng lại ở luồng nền khi quá ttl giây.
+
+    get() không bao giờ chờ việc dựng (quét cả kho POI có thể mất vài giây): trong lúc dựng vẫn
+    trả về chỉ mục cũ, lần đầu là chỉ mục rỗng.
+    """
+
+    def __init__(self, load_entries, ttl):
+        self.load_entries = load_entries
+        self.ttl = ttl
+        self.index = PlaceIndex([])
+        self.built_at = None
+        self.building = False
+        self.lock = threading.Lock()
+
+    def get(self):
+        with self.lock:
+            stale = self.built_at is None or time.monotonic() - self.built_at > self.ttl
+            if stale and not self.building:
+                self.building = True
+                threading.Thread(target=self.rebuild, name="place-index", daemon=True).start()
+        return self.index
+
+    def rebuild(self):
+        try:
+            self.index = PlaceIndex(self.load_entries())
+        except Exception as e:
+            print(f"Lỗi dựng chỉ mục địa điểm: {e}")
+        finally:
+            with self.lock:
+                self.built_at = time.monotonic()
+                self.building = False
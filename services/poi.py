@@ -0,0 +1,38 @@
+# poi.py
+from typing import NamedTuple, Optional
+
+
+class POI(NamedTuple):
+    """Bản ghi quán ăn gọn (tuple bất biến, không có __dict__) dùng chung cho
+    osm_service, kho POI, map_logic và các view.
+
+    Chỉ giữ các trường mà phần lọc món, giao diện và chatbot dùng tới. Các trường
+    xếp hạng (price, rating, reviews, score, distance_sort, travel_*) được điền bằng
+    _replace, nên bản ghi trong cache dùng chung không bao giờ bị sửa.
+    """
+    id: int
+    osm_type: str
+    name: str
+    lat: float
+    lon: float
+    address: str
+    cuisine: str = ""
+    dish: str = ""
+    amenity: str = ""
+    price: str = ""
+    rating: float = 0.0
+    reviews: int = 0
+    score: float = 0.0
+    distance_sort: float = 0.0
+    # Quãng đường/thời gian đi thực tế từ OSRM table, None nếu chưa có hoặc không có đường
+    travel_distance: Optional[float] = None
+    travel_duration: Optional[float] = None
+
+    @property
+    def best_distance(self):
+        """Quãng đường thực tế nếu đã có, nếu không thì khoảng cách đường chim bay."""
+        return self.travel_distance if self.travel_distance is not None else self.distance_sort
+
+    @property
+    def cuisine_label(self):
+        return self.cuisine or self.amenity or "shop"
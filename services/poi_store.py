@@ -0,0 +1,254 @@
+# poi_store.py
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from services.poi import POI
+from services.place_index import PlaceAggregator
+from utils.geo import latlon_to_tile
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pois (
+    id INTEGER PRIMARY KEY,
+    osm_type TEXT NOT NULL,
+    osm_id INTEGER NOT NULL,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    zoom INTEGER NOT NULL,
+    tx INTEGER NOT NULL,
+    ty INTEGER NOT NULL,
+    address TEXT,
+    tags TEXT NOT NULL,
+    UNIQUE (osm_type, osm_id)
+);
+CREATE INDEX IF NOT EXISTS pois_tile ON pois (zoom, tx, ty);
+-- Chỉ mục R-tree/FTS5 của phiên bản cũ, không còn dùng
+DROP TABLE IF EXISTS pois_rtree;
+DROP TABLE IF EXISTS pois_fts;
+DROP TABLE IF EXISTS places;
+CREATE TABLE IF NOT EXISTS place_names (
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    cy INTEGER NOT NULL,
+    cx INTEGER NOT NULL,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    weight INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (name, kind, cy, cx)
+);
+CREATE TABLE IF NOT EXISTS tiles (
+    zoom INTEGER NOT NULL,
+    tx INTEGER NOT NULL,
+    ty INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    source TEXT NOT NULL DEFAULT 'overpass',
+    PRIMARY KEY (zoom, tx, ty)
+);
+"""
+
+
+class POIStore:
+    """Kho POI trên đĩa (SQLite), đọc/ghi theo ô bản đồ qua chỉ mục (zoom, tx, ty).
+
+    Tìm theo bán kính và theo món làm trên các ô phủ vòng tìm kiếm (như cache RAM), nên kho
+    không cần R-tree/FTS riêng. Bảng tiles ghi lại ô nào đã được tải và lúc nào, để osm_service
+    biết ô nào còn dùng được sau khi khởi động lại mà không phải hỏi lại Overpass.
+    """
+
+    def __init__(self, path, zoom):
+        self.path = path
+        self.zoom = zoom
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.migrate()
+
+    def migrate(self):
+        # v1: trước đây ô Overpass bị timeout (HTTP 200 kèm "remark") vẫn được lưu với 0 POI và giữ
+        # POI_STORE_MAX_AGE; quên các ô rỗng này một lần để chúng được tải lại
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1:
+            count = self.forget_empty_tiles()
+            if count:
+                print(f"Kho POI: quên {count} ô rỗng để tải lại từ Overpass")
+            self.conn.execute("PRAGMA user_version = 1")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    # --- GHI ---
+    def delete_tile_places(self, tile):
+        zoom, x, y = tile
+        ids = [r[0] for r in self.conn.execute(
+            "SELECT id FROM pois WHERE zoom = ? AND tx = ? AND ty = ?", (zoom, x, y))]
+        self.delete_ids(ids)
+
+    def delete_ids(self, ids):
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            self.conn.execute(f"DELETE FROM pois WHERE id IN ({marks})", chunk)
+
+    def insert_place(self, place):
+        osm_type, osm_id = place.osm_type, place.id
+        lat, lon = place.lat, place.lon
+        x, y = latlon_to_tile(lat, lon, self.zoom)
+        tags = {"name": place.name, "cuisine": place.cuisine, "dish": place.dish, "amenity": place.amenity}
+
+        old = self.conn.execute(
+            "SELECT id FROM pois WHERE osm_type = ? AND osm_id = ?", (osm_type, osm_id)).fetchone()
+        if old:
+            self.delete_ids([old[0]])
+
+        self.conn.execute(
+            "INSERT INTO pois (osm_type, osm_id, lat, lon, zoom, tx, ty, address, tags) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (osm_type, osm_id, lat, lon, self.zoom, x, y, place.address, json.dumps(tags, ensure_ascii=False)),
+        )
+
+    def mark_tile(self, tile, source, fetched_at):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO tiles (zoom, tx, ty, fetched_at, source) VALUES (?, ?, ?, ?, ?)",
+            (*tile, fetched_at, source),
+        )
+
+    def save_tiles(self, tile_places, source="overpass", fetched_at=None):
+        """Ghi đè POI của các ô (zoom, x, y) -> places và đánh dấu thời điểm tải."""
+        fetched_at = fetched_at or time.time()
+        with self.lock, self.conn:
+            for tile, places in tile_places.items():
+                self.delete_tile_places(tile)
+                for place in places:
+                    self.insert_place(place)
+                self.mark_tile(tile, source, fetched_at)
+
+    def insert_places(self, places):
+        """Thêm/cập nhật một lô POI trong một transaction (dùng khi nhập dữ liệu offline)."""
+        with self.lock, self.conn:
+            for place in places:
+                self.insert_place(place)
+
+    def forget_empty_tiles(self, source="overpass"):
+        """Xóa đánh dấu các ô tải từ source mà không có POI nào, để lần tìm sau hỏi lại upstream.
+        Trả về số ô đã quên."""
+        with self.lock, self.conn:
+            cur = self.conn.execute(
+                """DELETE FROM tiles WHERE source = ? AND NOT EXISTS (
+                       SELECT 1 FROM pois p WHERE p.zoom = tiles.zoom AND p.tx = tiles.tx AND p.ty = tiles.ty)""",
+                (source,))
+            return cur.rowcount
+
+    def forget_tiles(self, source="overpass"):
+        """Xóa đánh dấu mọi ô tải từ source (POI cũ vẫn giữ, sẽ bị ghi đè khi tải lại)."""
+        with self.lock, self.conn:
+            return self.conn.execute("DELETE FROM tiles WHERE source = ?", (source,)).rowcount
+
+    def mark_tiles(self, tiles, source="import", fetched_at=None):
+        fetched_at = fetched_at or time.time()
+        with self.lock, self.conn:
+            for tile in tiles:
+                self.mark_tile(tile, source, fetched_at)
+
+    def save_places(self, places):
+        """Ghi tên địa danh lấy từ file OSM (các bộ của PlaceAggregator.rows()), dùng cho gợi ý địa điểm."""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO place_names (name, kind, cy, cx, lat, lon, weight) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                places)
+
+    # --- ĐỌC ---
+    def row_to_place(self, row):
+        tags = json.loads(row["tags"])
+        return POI(
+            id=row["osm_id"], osm_type=row["osm_type"], name=tags.get("name", ""),
+            lat=row["lat"], lon=row["lon"], address=row["address"],
+            cuisine=tags.get("cuisine", ""), dish=tags.get("dish", ""), amenity=tags.get("amenity", ""),
+        )
+
+    def fresh_tiles(self, tiles, max_age):
+        """Các ô đã có trong kho và chưa quá max_age giây (ô nhập offline không hết hạn)."""
+        if not tiles: return set()
+        min_time = time.time() - max_age
+        fresh = set()
+        with self.lock:
+            for zoom, x, y in tiles:
+                row = self.conn.execute(
+                    "SELECT fetched_at, source FROM tiles WHERE zoom = ? AND tx = ? AND ty = ?", (zoom, x, y)
+                ).fetchone()
+                if row and (row["source"] == "import" or row["fetched_at"] >= min_time):
+                    fresh.add((zoom, x, y))
+        return fresh
+
+    def load_tiles(self, tiles, max_age):
+        """Trả về dict ô -> places cho các ô còn hạn trong kho."""
+        found = {}
+        fresh = self.fresh_tiles(tiles, max_age)
+        with self.lock:
+            for tile in fresh:
+                rows = self.conn.execute(
+                    "SELECT * FROM pois WHERE zoom = ? AND tx = ? AND ty = ?", tile).fetchall()
+                found[tile] = [self.row_to_place(r) for r in rows]
+        return found
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM pois").fetchone()[0]
+
+    def place_names(self):
+        """Các tên địa điểm đã biết: địa danh nhập từ file OSM, tên quán, và đường/quận tách từ
+        địa chỉ quán. Đường kèm quận trong tên ("Lê Lợi, Quận 1") và được gom theo cụm gần nhau
+        (PlaceAggregator). Trả về list (name, kind, lat, lon, weight).
+        """
+        with self.lock:
+            names = [tuple(r) for r in self.conn.execute("SELECT name, kind, lat, lon, weight FROM place_names")]
+            rows = self.conn.execute("SELECT lat, lon, address, tags FROM pois").fetchall()
+
+        parts = PlaceAggregator()
+        for row in rows:
+            name = json.loads(row["tags"]).get("name")
+            if name:
+                names.append((name, "poi", row["lat"], row["lon"], 1))
+            # Địa chỉ dạng "số nhà, đường, quận": bỏ phần bắt đầu bằng số
+            streets, district = [], None
+            for i, part in enumerate((row["address"] or "").split(", ")):
+                part = part.strip()
+                if not part or part[0].isdigit() or part == "Đang cập nhật địa chỉ": continue
+                if i > 0 and part.lower().startswith(("quận", "huyện", "district", "thành phố")):
+                    district = part
+                else:
+                    streets.append(part)
+            if district:
+                parts.add(district, "district", row["lat"], row["lon"])
+            for street in streets:
+                parts.add(f"{street}, {district}" if district else street, "street", row["lat"], row["lon"])
+        names.extend((name, kind, lat, lon, n) for name, kind, _, _, lat, lon, n in parts.rows())
+        return names
+
+
+def main(argv=None):
+    from config.config import POI_STORE_PATH, OSM_TILE_ZOOM
+    parser = argparse.ArgumentParser(description="Bảo trì kho POI: quên các ô để tải lại từ Overpass")
+    parser.add_argument("--store", default=POI_STORE_PATH, help="Đường dẫn file SQLite của kho POI")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--forget-empty", action="store_true", help="Quên các ô Overpass không có POI nào")
+    group.add_argument("--forget-all", action="store_true", help="Quên mọi ô Overpass (ô nhập offline giữ nguyên)")
+    args = parser.parse_args(argv)
+
+    store = POIStore(args.store, OSM_TILE_ZOOM)
+    try:
+        count = store.forget_empty_tiles() if args.forget_empty else store.forget_tiles()
+    finally:
+        store.close()
+    print(f"Đã quên {count} ô -> {args.store}")
+
+
+if __name__ == "__main__":
+    main()
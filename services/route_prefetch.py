@@ -0,0 +1,65 @@
+# route_prefetch.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PrefetchBatch:
+    """Nhóm các lộ trình được tải trước cho một lần tìm kiếm; cancel() khi có tìm kiếm mới."""
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self.futures = []
+
+    def cancel(self):
+        self.cancelled.set()
+        for future in self.futures:
+            future.cancel()
+
+    @property
+    def done(self):
+        return all(f.done() for f in self.futures)
+
+
+class RoutePrefetcher:
+    """Tải trước lộ trình ở luồng nền với số luồng giới hạn, dùng chung cho mọi session.
+
+    fetch là hàm get_route: kết quả được ghi vào cache lộ trình, nên lần bấm "Đi" đầu
+    tiên không phải chờ OSRM. Script Streamlit không chờ các luồng này.
+
+    Hàng đợi có giới hạn: quá max_pending job đang chờ thì không nhận thêm, job chờ quá
+    max_age giây thì bỏ (người dùng đã xem kết quả khác, lộ trình đó không còn đáng tải trước).
+    """
+
+    def __init__(self, fetch, max_workers=2, max_pending=20, max_age=5):
+        self.fetch = fetch
+        self.max_pending = max_pending
+        self.max_age = max_age
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="route-prefetch")
+
+    def submit(self, start_lat, start_lon, destinations, mode="driving", lang="vi"):
+        batch = PrefetchBatch()
+        submitted_at = time.monotonic()
+        for lat, lon in destinations:
+            with self.lock:
+                if self.pending >= self.max_pending: break
+                self.pending += 1
+            future = self.executor.submit(self.run, batch, submitted_at, start_lat, start_lon, lat, lon, mode, lang)
+            # Gọi cả khi job bị cancel() trước lúc chạy
+            future.add_done_callback(self.job_done)
+            batch.futures.append(future)
+        return batch
+
+    def job_done(self, future):
+        with self.lock:
+            self.pending -= 1
+
+    def run(self, batch, submitted_at, start_lat, start_lon, end_lat, end_lon, mode, lang):
+        # Job còn trong hàng đợi nhưng lần tìm kiếm đã bị thay thế, hoặc đã chờ quá lâu, thì bỏ qua
+        if batch.cancelled.is_set() or time.monotonic() - submitted_at > self.max_age: return
+        try:
+            self.fetch(start_lat, start_lon, end_lat, end_lon, mode=mode, lang=lang)
+        except Exception as e:
+            print(f"Route prefetch error: {e}")
@@ -1,8 +1,24 @@
 # route_service.py
+import os
 import requests
 import time
+import numpy as np
+import streamlit as st
 from geopy.distance import geodesic
 from utils.translate import get_text
+from services.ttl_cache import TTLCache
+from services.circuit_breaker import CircuitBreaker
+from services.http_client import get_http_session
+from services.local_router import LocalRouter
+from services.route_prefetch import RoutePrefetcher
+from services.single_flight import SingleFlight
+from utils.polyline import decode_polyline
+from config.config import (
+    ROUTE_COORD_PRECISION, ROUTE_CACHE_SIZE, ROUTE_CACHE_TTL, ROUTE_FAILURE_TTL,
+    ROUTE_DEADLINE, OSRM_FAILURE_THRESHOLD, OSRM_RESET_TIMEOUT,
+    ROUTING_BACKEND, LOCAL_ROUTER_GRAPH, ROUTE_PREFETCH_COUNT, ROUTE_PREFETCH_WORKERS,
+    ROUTE_PREFETCH_MAX_PENDING, ROUTE_PREFETCH_MAX_AGE, TRAVEL_SPEEDS
+)
 
 def get_icon_and_instruction(maneuver, road_name, lang="vi"):
     m_type = maneuver.get('type')
@@ -46,8 +62,224 @@ def get_icon_and_instruction(maneuver, road_name, lang="vi"):
     
     return icon, instruction
 
+def format_steps(steps_raw, lang="vi"):
+    steps_data = []
+    for step in steps_raw:
+        maneuver = step.get('maneuver', {})
+        road_name = step.get('name', '')
+        icon, instruction = get_icon_and_instruction(maneuver, road_name, lang)
+        steps_data.append({
+            "icon": icon,
+            "instruction": instruction,
+            "distance": step.get('distance', 0),
+            "duration": step.get('duration', 0)
+        })
+    return steps_data
+
+OSRM_BASE_URL = "http://router.project-osrm.org"
+# Lỗi 400 của riêng cặp điểm (không có đường/không bắt được đường), không phải OSRM hỏng
+NO_ROUTE_CODES = ("NoRoute", "NoSegment")
+
+@st.cache_resource
+def get_route_cache():
+    # Dùng chung cho mọi session: rerun (đổi theme, bấm lại quán) không gọi lại OSRM
+    return TTLCache(maxsize=ROUTE_CACHE_SIZE, ttl=ROUTE_CACHE_TTL)
+
+@st.cache_resource
+def get_route_failure_cache():
+    # Khóa vừa gọi OSRM lỗi: rerun trong ROUTE_FAILURE_TTL giây trả lỗi ngay thay vì chờ OSRM lần nữa
+    return TTLCache(maxsize=ROUTE_CACHE_SIZE, ttl=ROUTE_FAILURE_TTL)
+
+def read_osrm_response(r):
+    """JSON trả về của OSRM. 400 kèm mã NoRoute/NoSegment vẫn trả về data để người gọi xử lý,
+    các mã lỗi HTTP khác raise HTTPError."""
+    if r.status_code == 400:
+        try:
+            data = r.json()
+        except ValueError:
+            data = {}
+        if data.get('code') in NO_ROUTE_CODES: return data
+    r.raise_for_status()
+    return r.json()
+
+def is_upstream_failure(e):
+    """Chỉ quá hạn, mất kết nối và lỗi 5xx mới tính vào circuit breaker; 4xx là lỗi của riêng request."""
+    if isinstance(e, (requests.Timeout, requests.ConnectionError)): return True
+    if isinstance(e, requests.HTTPError) and e.response is not None:
+        return e.response.status_code >= 500
+    return False
+
+def probe_osrm():
+    # Request rẻ nhất của OSRM, chỉ để kiểm tra upstream còn sống
+    r = get_http_session().get(f"{OSRM_BASE_URL}/nearest/v1/driving/106.6821,10.7623", timeout=3)
+    return r.status_code == 200
+
+@st.cache_resource
+def get_local_router():
+    """Đồ thị đường offline, None nếu không bật backend "local" hoặc chưa dựng file đồ thị."""
+    if ROUTING_BACKEND != "local": return None
+    if not os.path.exists(LOCAL_ROUTER_GRAPH):
+        print(f"Local router: không thấy {LOCAL_ROUTER_GRAPH}, dùng OSRM")
+        return None
+    return LocalRouter.load(LOCAL_ROUTER_GRAPH)
+
+@st.cache_resource
+def get_osrm_breaker():
+    return CircuitBreaker("OSRM", OSRM_FAILURE_THRESHOLD, OSRM_RESET_TIMEOUT, probe=probe_osrm)
+
+def route_cache_key(start_lat, start_lon, end_lat, end_lon, mode, lang):
+    q = ROUTE_COORD_PRECISION
+    return (round(start_lat, q), round(start_lon, q), round(end_lat, q), round(end_lon, q), mode, lang)
+
+@st.cache_resource
+def get_route_flight():
+    return SingleFlight()
+
 def get_route(start_lat, start_lon, end_lat, end_lon, mode="driving", lang="vi"):
-    base_url = "http://router.project-osrm.org/route/v1"
+    cache = get_route_cache()
+    key = route_cache_key(start_lat, start_lon, end_lat, end_lon, mode, lang)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    # Người dùng bấm cùng quán khi prefetch (hoặc người khác) đang tải: chờ chung một request OSRM
+    return get_route_flight().do(key, load_route, key, start_lat, start_lon, end_lat, end_lon, mode, lang)
+
+def load_route(key, start_lat, start_lon, end_lat, end_lon, mode, lang):
+    cache = get_route_cache()
+    # Lần gọi trước có thể vừa xong và ghi cache sau khi get_route kiểm tra
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    route = fetch_route(start_lat, start_lon, end_lat, end_lon, mode, lang)
+    # Không cache lộ trình ước lượng khi OSRM lỗi, để lần sau còn thử lại
+    steps = route[3]
+    if not (steps and steps[0].get('approximate')):
+        cache.set(key, route)
+    return route
+
+@st.cache_resource
+def get_route_prefetcher():
+    return RoutePrefetcher(get_route, max_workers=ROUTE_PREFETCH_WORKERS,
+                           max_pending=ROUTE_PREFETCH_MAX_PENDING, max_age=ROUTE_PREFETCH_MAX_AGE)
+
+def prefetch_routes(start_lat, start_lon, places, mode="driving", lang="vi"):
+    """Tải trước lộ trình tới ROUTE_PREFETCH_COUNT quán đầu danh sách, trả về PrefetchBatch (hoặc None)."""
+    places = places[:ROUTE_PREFETCH_COUNT]
+    # OSRM đang lỗi: các job chỉ rơi về đường dự phòng, không đáng chiếm luồng nền
+    if not places or get_osrm_breaker().is_open: return None
+    return get_route_prefetcher().submit(start_lat, start_lon, [(p.lat, p.lon) for p in places], mode, lang)
+
+def get_travel_matrix(start_lat, start_lon, destinations, mode="driving"):
+    """Quãng đường (m) và thời gian (s) thực tế từ điểm xuất phát tới mọi điểm đích trong MỘT request
+    tới dịch vụ table của OSRM. Phần tử None nghĩa là không có đường đi; trả về (None, None) khi lỗi.
+    """
+    if not destinations: return [], []
+    q = ROUTE_COORD_PRECISION
+    key = ("table", round(start_lat, q), round(start_lon, q), mode,
+           tuple((round(lat, q), round(lon, q)) for lat, lon in destinations))
+    cache = get_route_cache()
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    failures = get_route_failure_cache()
+    if failures.get(key): return None, None
+
+    router = get_local_router()
+    if router:
+        result = router.travel_matrix(start_lat, start_lon, destinations, mode)
+        if result[0] is not None:
+            cache.set(key, result)
+            return result
+        # Điểm xuất phát ngoài vùng đồ thị offline: hỏi OSRM
+
+    data = request_osrm_table([(start_lat, start_lon)] + list(destinations), mode,
+                              "sources=0&annotations=distance,duration")
+    if data is None:
+        failures.set(key, True)
+        return None, None
+
+    result = (data['distances'][0][1:], data['durations'][0][1:])
+    cache.set(key, result)
+    return result
+
+def get_duration_matrix(points, mode="driving"):
+    """Ma trận thời gian (s) giữa mọi cặp điểm, lấy trong MỘT request table của OSRM.
+    Phần tử None nghĩa là không có đường đi; trả về None khi lỗi.
+    """
+    q = ROUTE_COORD_PRECISION
+    key = ("matrix", mode, tuple((round(lat, q), round(lon, q)) for lat, lon in points))
+    cache = get_route_cache()
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    router = get_local_router()
+    matrix = [router.travel_matrix(lat, lon, points, mode)[1] for lat, lon in points] if router else None
+    if matrix is None or any(row is None for row in matrix):
+        # Không có đồ thị offline, hoặc có điểm nằm ngoài vùng đồ thị: hỏi OSRM
+        data = request_osrm_table(points, mode, "annotations=duration")
+        if data is None: return None
+        matrix = data['durations']
+
+    cache.set(key, matrix)
+    return matrix
+
+def request_osrm_table(points, mode, query):
+    breaker = get_osrm_breaker()
+    if not breaker.allow(): return None
+
+    coords = ";".join(f"{lon},{lat}" for lat, lon in points)
+    url = f"{OSRM_BASE_URL}/table/v1/{mode}/{coords}?{query}"
+    try:
+        r = get_http_session().get(url, timeout=min(10, ROUTE_DEADLINE))
+        data = read_osrm_response(r)
+        breaker.record_success()
+        if data.get('code') != 'Ok': raise ValueError(data.get('code'))
+        return data
+    except requests.RequestException as e:
+        if is_upstream_failure(e):
+            breaker.record_failure()
+        print(f"OSRM Table Error: {e}")
+    except Exception as e:
+        print(f"OSRM Table Error: {e}")
+    return None
+
+def travel_speed(mode):
+    """Vận tốc trung bình (m/s) theo phương tiện, lấy từ TRAVEL_SPEEDS."""
+    if mode == 'bicycling': mode = 'cycling'
+    return TRAVEL_SPEEDS.get(mode, TRAVEL_SPEEDS['driving'])
+
+def approximate_route(start_lat, start_lon, end_lat, end_lon, mode="driving", lang="vi"):
+    dist_m = int(geodesic((start_lat, start_lon), (end_lat, end_lon)).meters)
+    v = travel_speed(mode)
+    dur_s = int(dist_m / v) if v > 0 else 0
+    path = np.array([[start_lat, start_lon], [end_lat, end_lon]])
+    steps = [{
+        "icon": "⬆️",
+        "instruction": get_text("nav_default", lang).format(get_text("unnamed", lang)),
+        "distance": dist_m,
+        "duration": dur_s,
+        "approximate": True
+    }]
+    return path, dist_m, dur_s, steps
+
+def fetch_route(start_lat, start_lon, end_lat, end_lon, mode="driving", lang="vi"):
+    router = get_local_router()
+    if router:
+        result = router.route(start_lat, start_lon, end_lat, end_lon, mode)
+        if result:
+            path, distance, duration, steps_raw = result
+            return np.asarray(path, dtype=np.float64), distance, duration, format_steps(steps_raw, lang)
+        # Điểm nằm ngoài vùng đồ thị hoặc không có đường nối: thử OSRM
+
+    breaker = get_osrm_breaker()
+    if not breaker.allow():
+        # OSRM đang lỗi: trả ngay lộ trình ước lượng, luồng nền sẽ tự thử lại upstream
+        return approximate_route(start_lat, start_lon, end_lat, end_lon, mode, lang)
+
+    base_url = f"{OSRM_BASE_URL}/route/v1"
+    session = get_http_session()
+    deadline = time.monotonic() + ROUTE_DEADLINE
 
     modes_to_try = [mode]
     for m in ("driving", "walking", "cycling"):
@@ -56,50 +288,42 @@ def get_route(start_lat, start_lon, end_lat, end_lon, mode="driving", lang="vi")
 
     last_error = None
     for try_mode in modes_to_try:
-        url = f"{base_url}/{try_mode}/{start_lon},{start_lat};{end_lon},{end_lat}?overview=full&geometries=geojson&steps=true"
+        url = f"{base_url}/{try_mode}/{start_lon},{start_lat};{end_lon},{end_lat}?overview=full&geometries=polyline6&steps=true"
         for attempt in range(3):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not breaker.allow():
+                break
             try:
-                r = requests.get(url, timeout=6)
-                r.raise_for_status()
-                data = r.json()
+                r = session.get(url, timeout=min(6, remaining))
+                data = read_osrm_response(r)
+                breaker.record_success()
+                if data.get('code') in NO_ROUTE_CODES:
+                    # Cặp điểm này không có đường đi: không thử lại, không tính là OSRM lỗi
+                    print(f"OSRM: {data['code']} ({try_mode})")
+                    return approximate_route(start_lat, start_lon, end_lat, end_lon, mode, lang)
                 if 'routes' not in data or not data['routes']:
                     last_error = f"No routes returned for mode {try_mode}"
                     break
                 route = data['routes'][0]
 
-                geometry = route['geometry']['coordinates']
-                path = [[point[1], point[0]] for point in geometry]
+                # Mảng (n, 2) [lat, lon]: gọn hơn list các list khi lưu trong cache lộ trình
+                path = decode_polyline(route['geometry'])
 
                 steps_raw = route.get('legs', [{}])[0].get('steps', [])
-                steps_data = []
-
-                for step in steps_raw:
-                    maneuver = step.get('maneuver', {})
-                    road_name = step.get('name', '')
-                    icon, instruction = get_icon_and_instruction(maneuver, road_name, lang)
-                    steps_data.append({
-                        "icon": icon,
-                        "instruction": instruction,
-                        "distance": step.get('distance', 0),
-                        "duration": step.get('duration', 0)
-                    })
+                steps_data = format_steps(steps_raw, lang)
 
                 return path, route.get('distance', 0), route.get('duration', 0), steps_data
             except Exception as e:
                 last_error = f"mode {try_mode} attempt {attempt}: {e}"
-                time.sleep(0.3)
+                if not is_upstream_failure(e):
+                    # Lỗi của riêng request (4xx, dữ liệu lạ): thử lại cũng vậy
+                    break
+                breaker.record_failure()
+                time.sleep(min(0.3, max(0, deadline - time.monotonic())))
                 continue
-    if last_error:
-        print(f"OSRM Error: {last_error}")
-        dist_m = int(geodesic((start_lat, start_lon), (end_lat, end_lon)).meters)
-        v = 1.2 if mode == 'walking' else 3.5 if mode == 'cycling' or mode == 'bicycling' else 7.0
-        dur_s = int(dist_m / v) if v > 0 else 0
-        path = [[start_lat, start_lon], [end_lat, end_lon]]
-        steps = [{
-            "icon": "⬆️",
-            "instruction": get_text("nav_default", lang).format(get_text("unnamed", lang)),
-            "distance": dist_m,
-            "duration": dur_s,
-            "approximate": True
-        }]
-        return path, dist_m, dur_s, steps
\ No newline at end of file
+        if time.monotonic() >= deadline:
+            last_error = f"{last_error} (quá hạn {ROUTE_DEADLINE}s)"
+            break
+
+    print(f"OSRM Error: {last_error or 'circuit open'}")
+    return approximate_route(start_lat, start_lon, end_lat, end_lon, mode, lang)
@@ -1,123 +1,165 @@
 # search_engine.py
 from unidecode import unidecode
 from utils.search_data import DISH_DATABASE, CATEGORY_MAPPINGS
+from services.alias_index import AliasIndex
+from services.fuzzy_lookup import FuzzyIndex
 
 def normalize_text(text):
     if not text: return ""
     return unidecode(text).strip().lower()
 
+INGREDIENT_MAPPINGS = {
+    "gà": ["chicken", "cơm gà", "phở gà", "gà rán", "lẩu gà", "cháo gà", "kfc", "lotteria"],
+    "ga": ["chicken", "cơm gà", "phở gà", "gà rán"],
+    "chicken": ["gà", "fried chicken", "com ga"],
+
+    "bò": ["beef", "phở bò", "bún bò", "bò kho", "bít tết", "steak"],
+    "bo": ["beef", "pho bo", "bun bo"],
+    "beef": ["bò", "steak"],
+
+    "cá": ["fish", "bún cá", "chả cá", "cá kho"],
+    "ca": ["fish", "bun ca"],
+
+    "ốc": ["snail", "hải sản", "seafood", "oc"],
+    "oc": ["snail", "hai san"],
+
+    "vịt": ["duck", "vịt quay", "cháo vịt"],
+    "vit": ["duck", "vit quay"],
+
+    "cơm": ["rice", "cơm tấm", "cơm gà", "cơm rang", "cơm niêu"],
+    "com": ["rice", "com tam", "com ga"],
+
+    "bún": ["vermicelli", "bún bò", "bún chả", "bún riêu"],
+    "bun": ["vermicelli", "bun bo", "bun cha"]
+}
+
+BASIC_FOODS = {
+    "com", "bun", "pho", "mi", "banh", "lau", "nuong",
+    "ga", "bo", "heo", "vit", "ca", "tom", "muc", "trung", "oc",
+    "chicken", "beef", "pork", "fish", "rice", "noodle", "shrimp", "squid", "soup",
+    "coffee", "cafe", "tra", "tea", "bread", "steak", "pizza", "pasta"
+}
+
+# --- CHỈ MỤC DỰNG SẴN (chỉ chuẩn hóa dữ liệu một lần lúc import) ---
+# DISH_ENTRIES[i] = (tên chuẩn, [tên chuẩn] + aliases); payload của DISH_INDEX là (i, vị trí term)
+# để giữ đúng thứ tự ưu tiên "món đầu tiên, term đầu tiên" như khi duyệt tuần tự.
+DISH_ENTRIES = [(standard_name, [standard_name] + aliases) for standard_name, aliases in DISH_DATABASE.items()]
+DISH_INDEX = AliasIndex(
+    (normalize_text(term), (dish_idx, term_idx))
+    for dish_idx, (_, terms) in enumerate(DISH_ENTRIES)
+    for term_idx, term in enumerate(terms)
+)
+
+CATEGORY_ENTRIES = [(cat_key, normalize_text(cat_key), cat_values) for cat_key, cat_values in CATEGORY_MAPPINGS.items()]
+CATEGORY_RAW_INDEX = AliasIndex(
+    (val, cat_idx)
+    for cat_idx, (_, _, cat_values) in enumerate(CATEGORY_ENTRIES)
+    for val in cat_values
+)
+CATEGORY_NORM_INDEX = AliasIndex(
+    (normalize_text(val), (cat_idx, val))
+    for cat_idx, (_, _, cat_values) in enumerate(CATEGORY_ENTRIES)
+    for val in cat_values
+)
+
+# Tra cứu gần đúng (gõ sai/thiếu dấu) trên cùng tập alias đã chuẩn hóa, giới hạn 5ms mỗi truy vấn
+FUZZY_TIME_BUDGET = 0.005
+DISH_FUZZY_INDEX = FuzzyIndex(DISH_INDEX.exact)
+
+def find_dish_hits(norm_query, min_containing_len=2):
+    """Trả về các payload (dish_idx, term_idx) có term nằm trong truy vấn hoặc chứa truy vấn."""
+    hits = [p for term in DISH_INDEX.terms_in(norm_query) for p in DISH_INDEX.get(term)]
+    if len(norm_query) > min_containing_len:
+        for term in DISH_INDEX.terms_containing(norm_query):
+            hits.extend(DISH_INDEX.get(term))
+    return hits
+
+def find_fuzzy_dish_hits(norm_query, limit=5, time_budget=FUZZY_TIME_BUDGET):
+    """Trả về các (dish_idx, term_idx, distance) gần đúng nhất, mỗi món một lần."""
+    hits = []
+    seen = set()
+    for term, dist in DISH_FUZZY_INDEX.lookup(norm_query, limit=limit * 2, time_budget=time_budget):
+        for dish_idx, term_idx in DISH_INDEX.get(term):
+            if dish_idx in seen: continue
+            seen.add(dish_idx)
+            hits.append((dish_idx, term_idx, dist))
+    return hits[:limit]
+
+def fuzzy_find_dishes(user_query, limit=5, time_budget=FUZZY_TIME_BUDGET):
+    """Gợi ý món theo độ gần đúng: danh sách (tên chuẩn, term khớp, số lỗi) đã xếp hạng."""
+    norm_query = normalize_text(user_query.lower().strip())
+    return [
+        (DISH_ENTRIES[dish_idx][0], DISH_ENTRIES[dish_idx][1][term_idx], dist)
+        for dish_idx, term_idx, dist in find_fuzzy_dish_hits(norm_query, limit, time_budget)
+    ]
+
+def add_dish_keywords(final_keywords, dish_idx, term_idx):
+    standard_name, terms = DISH_ENTRIES[dish_idx]
+    final_keywords.add(standard_name)
+    final_keywords.add(terms[term_idx])
+    for a in terms[1:4]:
+        final_keywords.add(a)
+
 # Kiểm tra xem từ khóa có phải là thuật ngữ ẩm thực đã biết không
 def is_known_food_term(user_query):
     raw_query = user_query.lower().strip()
     norm_query = normalize_text(raw_query)
-    
-    for cat_key, cat_values in CATEGORY_MAPPINGS.items():
-        if cat_key in raw_query or normalize_text(cat_key) in norm_query: return True
-        for val in cat_values:
-            if val in raw_query: return True
-            
-    for standard_name, aliases in DISH_DATABASE.items():
-        if normalize_text(standard_name) in norm_query: return True
-        
-        for alias in aliases:
-            norm_alias = normalize_text(alias)
-            if norm_alias in norm_query or (len(norm_query) > 3 and norm_query in norm_alias):
-                return True
-                
-    basic_foods = [
-        "com", "bun", "pho", "mi", "banh", "lau", "nuong", 
-        "ga", "bo", "heo", "vit", "ca", "tom", "muc", "trung", "oc",
-        "chicken", "beef", "pork", "fish", "rice", "noodle", "shrimp", "squid", "soup",
-        "coffee", "cafe", "tra", "tea", "bread", "steak", "pizza", "pasta"
-    ]
+
+    for cat_key, cat_norm, _ in CATEGORY_ENTRIES:
+        if cat_key in raw_query or cat_norm in norm_query: return True
+    if CATEGORY_RAW_INDEX.terms_in(raw_query): return True
+
+    if find_dish_hits(norm_query, min_containing_len=3): return True
+    if find_fuzzy_dish_hits(norm_query, limit=1): return True
+
     query_words = norm_query.split()
-    for food in basic_foods:
-        if food == norm_query or food in query_words:
-            return True
-            
+    if norm_query in BASIC_FOODS or any(w in BASIC_FOODS for w in query_words):
+        return True
+
     return False
 
 def expand_search_query_smart(user_query):
     raw_query = user_query.lower().strip()
     norm_query = normalize_text(raw_query)
-    
+
     final_keywords = set()
-    
-    dish_found = False
-    for standard_name, aliases in DISH_DATABASE.items():
-        check_list = [standard_name] + aliases
-        for term in check_list:
-            term_norm = normalize_text(term)
-            
-            is_match = False
-            
-            if term_norm == norm_query:
-                is_match = True
-            
-            elif term_norm in norm_query:
-                is_match = True
-                
-            elif len(norm_query) > 2 and norm_query in term_norm:
-                is_match = True
-                
-            if is_match:
-                final_keywords.add(standard_name) 
-                final_keywords.add(term)          
-                for a in aliases[:3]: 
-                    final_keywords.add(a)
-                dish_found = True
-                break
-        if dish_found: break 
 
+    hits = find_dish_hits(norm_query)
+    dish_found = bool(hits)
+    if dish_found:
+        dish_idx, term_idx = min(hits)
+        add_dish_keywords(final_keywords, dish_idx, term_idx)
 
     if not dish_found:
-        for cat_key, cat_values in CATEGORY_MAPPINGS.items():
-            
-            if cat_key in raw_query or normalize_text(cat_key) in norm_query:
+        matched_cats = set()
+        for cat_idx, (cat_key, cat_norm, cat_values) in enumerate(CATEGORY_ENTRIES):
+            if cat_key in raw_query or cat_norm in norm_query:
                 final_keywords.update(cat_values)
-            else:
-                for val in cat_values:
-                    
-                    if val == raw_query or normalize_text(val) == norm_query: 
-                        final_keywords.add(val)
-                        final_keywords.add(cat_key)
-
-    ingredient_mappings = {
-        "gà": ["chicken", "cơm gà", "phở gà", "gà rán", "lẩu gà", "cháo gà", "kfc", "lotteria"],
-        "ga": ["chicken", "cơm gà", "phở gà", "gà rán"],
-        "chicken": ["gà", "fried chicken", "com ga"],
-        
-        "bò": ["beef", "phở bò", "bún bò", "bò kho", "bít tết", "steak"],
-        "bo": ["beef", "pho bo", "bun bo"],
-        "beef": ["bò", "steak"],
-        
-        "cá": ["fish", "bún cá", "chả cá", "cá kho"],
-        "ca": ["fish", "bun ca"],
-        
-        "ốc": ["snail", "hải sản", "seafood", "oc"],
-        "oc": ["snail", "hai san"],
-        
-        "vịt": ["duck", "vịt quay", "cháo vịt"],
-        "vit": ["duck", "vit quay"],
-        
-        "cơm": ["rice", "cơm tấm", "cơm gà", "cơm rang", "cơm niêu"],
-        "com": ["rice", "com tam", "com ga"],
-        
-        "bún": ["vermicelli", "bún bò", "bún chả", "bún riêu"],
-        "bun": ["vermicelli", "bun bo", "bun cha"]
-    }
-
-    if norm_query in ingredient_mappings:
-        final_keywords.update(ingredient_mappings[norm_query])
+                matched_cats.add(cat_idx)
+
+        for cat_idx, val in CATEGORY_NORM_INDEX.get(norm_query):
+            if cat_idx not in matched_cats:
+                final_keywords.add(val)
+                final_keywords.add(CATEGORY_ENTRIES[cat_idx][0])
+
+        # Không khớp chính xác món hay nhóm nào: thử tra cứu gần đúng
+        if not final_keywords:
+            fuzzy_hits = find_fuzzy_dish_hits(norm_query, limit=1)
+            if fuzzy_hits:
+                dish_idx, term_idx, _ = fuzzy_hits[0]
+                add_dish_keywords(final_keywords, dish_idx, term_idx)
+
+    if norm_query in INGREDIENT_MAPPINGS:
+        final_keywords.update(INGREDIENT_MAPPINGS[norm_query])
     else:
-        for key, values in ingredient_mappings.items():
+        for key, values in INGREDIENT_MAPPINGS.items():
             if f" {key} " in f" {norm_query} " or key == norm_query:
                 final_keywords.update(values)
 
-    
+
     final_keywords.add(raw_query)
     final_keywords.add(norm_query)
 
     result = [k for k in final_keywords if len(k) >= 2]
-    
-    return list(result)
\ No newline at end of file
+
+    return list(result)
@@ -0,0 +1,87 @@
+# single_flight.py
+import threading
+from concurrent.futures import Future
+
+# Kết quả báo cho người chờ rằng leader không chạy xong và họ phải tự gọi lại
+RETRY = object()
+
+
+class SingleFlight:
+    """Gộp các lần gọi đồng thời cùng khóa thành một request upstream duy nhất.
+
+    Người gọi đầu tiên (leader) chạy hàm; những người gọi trùng khóa trong lúc đó chỉ chờ
+    và nhận cùng kết quả (hoặc cùng Exception; leader bị rerun/stop thì họ tự gọi lại).
+    Xong là khóa được xóa, lần gọi sau chạy lại bình thường: đây không phải cache, chỉ lấp
+    khoảng trống trước khi cache kịp có dữ liệu.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        while True:
+            with self.lock:
+                future = self.calls.get(key)
+                leader = future is None
+                if leader:
+                    future = self.calls[key] = Future()
+            if leader:
+                return self.lead(key, future, fn, *args, **kwargs)
+            result = future.result()
+            # Leader bị dừng giữa chừng (rerun/stop của Streamlit): tự chạy lại thay vì nhận exception của session khác
+            if result is not RETRY:
+                return result
+
+    def do_many(self, keys, fn):
+        """Gộp theo từng khóa cho một lô: fn(các khóa chưa ai chạy) -> {khóa: kết quả}.
+
+        Khóa đang được lượt khác chạy thì chờ lượt đó, phần còn lại chạy chung một lần fn. Hai lô
+        chỉ trùng một phần (hai vòng tìm kiếm chồng lên nhau) vẫn không tải lại phần chung.
+        Khóa của do_many không được trùng khóa của do (Future ở đây giữ cả dict của lô).
+        """
+        results = {}
+        keys = list(keys)
+        while keys:
+            batch = Future()
+            own, waiting = [], {}
+            with self.lock:
+                for key in keys:
+                    future = self.calls.get(key)
+                    if future is None:
+                        self.calls[key] = batch
+                        own.append(key)
+                    else:
+                        waiting[key] = future
+            if own:
+                results.update(self.lead(own, batch, fn, own))
+            keys = []
+            for key, future in waiting.items():
+                value = future.result()
+                if value is RETRY:
+                    keys.append(key)
+                else:
+                    results[key] = value[key]
+        return results
+
+    def lead(self, key, future, fn, *args, **kwargs):
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self.release(key)
+            future.set_exception(e)
+            raise
+        except BaseException:
+            # RerunException/StopException chỉ thuộc về session của leader, không chuyển cho người khác
+            self.release(key)
+            future.set_result(RETRY)
+            raise
+        self.release(key)
+        future.set_result(result)
+        return result
+
+    def release(self, key):
+        # Xóa khóa trước khi báo kết quả, để người chờ gọi lại (RETRY) tạo lượt mới chứ không gặp lại Future cũ
+        with self.lock:
+            for k in (key if isinstance(key, list) else [key]):
+                self.calls.pop(k, None)
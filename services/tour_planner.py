@@ -0,0 +1,123 @@
+# tour_planner.py
+"""Food tour: sắp thứ tự ghé nhiều quán sao cho tổng thời gian di chuyển nhỏ nhất.
+
+Bài toán người du lịch dạng đường đi mở (xuất phát từ vị trí người dùng, không quay về).
+Với số điểm của một food tour (<= 8 quán) giải chính xác bằng quy hoạch động Held-Karp
+(vài ms); nhiều điểm hơn thì dùng láng giềng gần nhất + 2-opt. Ma trận có thể không đối
+xứng (đường một chiều) nên mỗi bước 2-opt tính lại trọn chi phí đoạn bị đảo.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from services.route_service import get_duration_matrix, get_route, travel_speed
+from utils.geo import haversine_many
+
+# Chi phí thay cho cặp điểm không có đường đi, để thuật toán vẫn so sánh được
+UNREACHABLE = 1e9
+# Tối đa bao nhiêu điểm (không kể điểm xuất phát) thì còn giải chính xác: 2^n * n^2 phép tính
+EXACT_MAX_STOPS = 9
+
+
+def path_cost(order, durations):
+    return sum(durations[a][b] for a, b in zip(order, order[1:]))
+
+
+def nearest_neighbour_order(durations, start=0):
+    order = [start]
+    left = set(range(len(durations))) - {start}
+    while left:
+        last = order[-1]
+        nxt = min(left, key=lambda j: (durations[last][j], j))
+        order.append(nxt)
+        left.remove(nxt)
+    return order
+
+
+def two_opt(order, durations, time_budget=0.05):
+    """Đảo đoạn order[i:j+1] khi làm giảm tổng chi phí; điểm xuất phát order[0] giữ nguyên."""
+    deadline = time.perf_counter() + time_budget
+    best = list(order)
+    best_cost = path_cost(best, durations)
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(1, len(best) - 1):
+            for j in range(i + 1, len(best)):
+                candidate = best[:i] + best[i:j + 1][::-1] + best[j + 1:]
+                cost = path_cost(candidate, durations)
+                if cost < best_cost - 1e-9:
+                    best, best_cost = candidate, cost
+                    improved = True
+    return best
+
+
+def held_karp_order(durations, start=0):
+    """Thứ tự tối ưu cho đường đi mở từ start qua mọi điểm còn lại."""
+    others = [i for i in range(len(durations)) if i != start]
+    n = len(others)
+    # best[(mask, k)] = (chi phí nhỏ nhất đi qua tập mask và kết thúc ở others[k], k trước đó)
+    best = {(1 << k, k): (durations[start][others[k]], None) for k in range(n)}
+    for mask in range(1, 1 << n):
+        for k in range(n):
+            state = best.get((mask, k))
+            if state is None: continue
+            cost = state[0]
+            for j in range(n):
+                if mask & (1 << j): continue
+                key = (mask | (1 << j), j)
+                new_cost = cost + durations[others[k]][others[j]]
+                if key not in best or new_cost < best[key][0]:
+                    best[key] = (new_cost, k)
+
+    full = (1 << n) - 1
+    k = min(range(n), key=lambda k: best[(full, k)][0])
+    order = []
+    mask = full
+    while k is not None:
+        order.append(others[k])
+        k, mask = best[(mask, k)][1], mask & ~(1 << k)
+    return [start] + order[::-1]
+
+
+def solve_tour(durations, start=0):
+    """Thứ tự ghé (danh sách chỉ số, bắt đầu bằng start) cho ma trận thời gian durations."""
+    matrix = [[UNREACHABLE if d is None else d for d in row] for row in durations]
+    if len(matrix) <= 2: return list(range(len(matrix)))
+    if len(matrix) - 1 <= EXACT_MAX_STOPS:
+        return held_karp_order(matrix, start)
+    return two_opt(nearest_neighbour_order(matrix, start), matrix)
+
+
+def estimate_durations(points, mode):
+    """Ma trận thời gian ước lượng theo đường chim bay khi không gọi được OSRM."""
+    v = travel_speed(mode)
+    lats = np.array([p[0] for p in points])
+    lons = np.array([p[1] for p in points])
+    return [(haversine_many(lat, lon, lats, lons) / v).tolist() for lat, lon in points]
+
+
+def plan_tour(start_lat, start_lon, places, mode="driving", lang="vi"):
+    """Lộ trình food tour từ vị trí người dùng qua mọi quán trong places.
+
+    Trả về dict: stops (POI theo thứ tự ghé), path (mảng (n, 2) nối các chặng),
+    distance (m), duration (s), legs (kết quả get_route của từng chặng).
+    """
+    points = [(start_lat, start_lon)] + [(p.lat, p.lon) for p in places]
+    durations = get_duration_matrix(points, mode)
+    if not durations or len(durations) != len(points):
+        durations = estimate_durations(points, mode)
+    order = solve_tour(durations)
+
+    pairs = [(points[a], points[b]) for a, b in zip(order, order[1:])]
+    # Các chặng đi qua get_route nên dùng lại cache lộ trình (kể cả lộ trình đã tải trước)
+    with ThreadPoolExecutor(max_workers=4, thread_name_prefix="tour-leg") as pool:
+        legs = list(pool.map(lambda ab: get_route(*ab[0], *ab[1], mode=mode, lang=lang), pairs))
+
+    paths = [np.asarray(leg[0], dtype=np.float64) for leg in legs]
+    return {
+        "stops": [places[i - 1] for i in order[1:]],
+        "path": np.concatenate(paths) if paths else np.empty((0, 2)),
+        "distance": sum(leg[1] for leg in legs),
+        "duration": sum(leg[2] for leg in legs),
+        "legs": legs,
+    }
@@ -0,0 +1,54 @@
+# ttl_cache.py
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Cache dùng chung giữa các session: giới hạn số phần tử (LRU) và thời gian sống (TTL)."""
+
+    def __init__(self, maxsize=1024, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.data)
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self.lock:
+            item = self.data.get(key)
+            if item is None: return default
+            expires_at, value = item
+            if expires_at < now:
+                del self.data[key]
+                return default
+            self.data.move_to_end(key)
+            return value
+
+    def get_many(self, keys):
+        """Trả về dict chỉ gồm các khóa còn hạn trong cache."""
+        found = {}
+        for key in keys:
+            value = self.get(key, None)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl
+        with self.lock:
+            self.data[key] = (expires_at, value)
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def set_many(self, items):
+        for key, value in items.items():
+            self.set(key, value)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
@@ -0,0 +1,94 @@
+# catalogs.py
+"""Bản dịch dựng sẵn cho nhãn giao diện (BASE_TEXTS), để get_text chỉ là tra dict.
+
+Dựng/cập nhật (cần mạng, chạy mỗi khi sửa BASE_TEXTS):
+    python -m utils.catalogs
+    python -m utils.catalogs --langs en ja
+
+Mỗi file <lang>.json lưu bản dịch kèm câu gốc tiếng Việt đã dùng để dịch; khi câu gốc đổi thì
+bản dịch cũ bị bỏ qua lúc nạp và được dịch lại ở lần build sau (chỉ dịch các khóa thay đổi).
+"""
+import argparse
+import json
+import os
+import string
+import time
+from config.config import BASE_TEXTS, LANGUAGE_OPTIONS, CATALOG_DIR
+
+FORMATTER = string.Formatter()
+
+
+def catalog_path(lang, directory=CATALOG_DIR):
+    return os.path.join(directory, f"{lang}.json")
+
+
+def read_catalog(lang, directory=CATALOG_DIR):
+    """Nội dung file catalog ({"source": {...}, "texts": {...}}), rỗng nếu chưa dựng."""
+    try:
+        with open(catalog_path(lang, directory), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"source": {}, "texts": {}}
+
+
+def load_catalog(lang, directory=CATALOG_DIR):
+    """Dict key -> bản dịch, chỉ gồm các khóa có câu gốc còn khớp BASE_TEXTS hiện tại."""
+    data = read_catalog(lang, directory)
+    source, texts = data.get("source", {}), data.get("texts", {})
+    return {k: v for k, v in texts.items() if k in BASE_TEXTS and source.get(k) == BASE_TEXTS[k]}
+
+
+def placeholders(text):
+    """Các chỗ điền {} / {:.2f} trong chuỗi, theo thứ tự."""
+    try:
+        return [(field, spec) for _, field, spec, _ in FORMATTER.parse(text) if field is not None]
+    except ValueError:
+        return None
+
+
+def build_catalog(lang, directory=CATALOG_DIR, translate_batch=None):
+    """Dịch các khóa mới/đổi của BASE_TEXTS sang lang và ghi file. Trả về số khóa đã dịch."""
+    old = read_catalog(lang, directory)
+    current = load_catalog(lang, directory)
+    missing = [k for k in BASE_TEXTS if k not in current]
+
+    if missing:
+        translated = translate_batch([BASE_TEXTS[k] for k in missing], lang)
+        for key, text in zip(missing, translated):
+            # Bản dịch làm hỏng chỗ điền của .format() thì giữ câu gốc cho an toàn
+            if not text or placeholders(text) != placeholders(BASE_TEXTS[key]):
+                print(f"  [{lang}] {key}: bản dịch không giữ được chỗ điền, dùng câu gốc")
+                text = BASE_TEXTS[key]
+            current[key] = text
+
+    data = {
+        "source": {k: BASE_TEXTS[k] for k in current},
+        "texts": {k: current[k] for k in BASE_TEXTS if k in current},
+    }
+    if missing or data != old:
+        os.makedirs(directory, exist_ok=True)
+        with open(catalog_path(lang, directory), "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+    return len(missing)
+
+
+def google_translate_batch(texts, lang):
+    from deep_translator import GoogleTranslator
+    target = 'zh-CN' if lang == 'zh' else lang
+    return GoogleTranslator(source='vi', target=target).translate_batch(texts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dựng bản dịch nhãn giao diện cho từng ngôn ngữ")
+    parser.add_argument("--langs", nargs="*", default=[l for l in LANGUAGE_OPTIONS if l != "vi"])
+    parser.add_argument("--out", default=CATALOG_DIR)
+    args = parser.parse_args(argv)
+
+    for lang in args.langs:
+        started = time.time()
+        count = build_catalog(lang, args.out, google_translate_batch)
+        print(f"{lang}: dịch {count} khóa trong {time.time() - started:.1f}s -> {catalog_path(lang, args.out)}")
+
+
+if __name__ == "__main__":
+    main()
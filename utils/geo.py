@@ -0,0 +1,145 @@
+# geo.py
+import math
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEG_LAT = 111320.0
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Khoảng cách đường chim bay (m) giữa hai điểm theo công thức haversine."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+def haversine_many(lat, lon, lats, lons):
+    """Khoảng cách (m) từ một điểm tới nhiều điểm trong một lần tính trên mảng NumPy.
+
+    Sai số so với geodesic (ellipsoid) khoảng 0.5%, đủ để sắp xếp và lọc bán kính vài km.
+    """
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    lons = np.radians(np.asarray(lons, dtype=np.float64))
+    p1 = math.radians(lat)
+    a = np.sin((lats - p1) / 2) ** 2 + math.cos(p1) * np.cos(lats) * np.sin((lons - math.radians(lon)) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+def distances_to(lat, lon, places):
+    """Khoảng cách (m) từ (lat, lon) tới từng POI trong places, theo đúng thứ tự."""
+    if not places: return np.empty(0)
+    coords = np.array([(p.lat, p.lon) for p in places], dtype=np.float64)
+    return haversine_many(lat, lon, coords[:, 0], coords[:, 1])
+
+# --- Ô BẢN ĐỒ (slippy map tiles, chuẩn OSM z/x/y) ---
+def latlon_to_tile(lat, lon, zoom):
+    n = 2 ** zoom
+    x = int((lon + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+def tile_bounds(x, y, zoom):
+    """Trả về (south, west, north, east) của ô (x, y)."""
+    n = 2 ** zoom
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return south, west, north, east
+
+def tiles_covering(lat, lon, radius, zoom):
+    """Các ô (x, y) giao với vòng tròn bán kính radius (m) quanh (lat, lon)."""
+    dlat = radius / METERS_PER_DEG_LAT
+    dlon = radius / (METERS_PER_DEG_LAT * max(math.cos(math.radians(lat)), 1e-6))
+    x_min, y_min = latlon_to_tile(lat + dlat, lon - dlon, zoom)
+    x_max, y_max = latlon_to_tile(lat - dlat, lon + dlon, zoom)
+
+    tiles = []
+    for y in range(y_min, y_max + 1):
+        for x in range(x_min, x_max + 1):
+            south, west, north, east = tile_bounds(x, y, zoom)
+            # Điểm gần tâm nhất trong ô
+            near_lat = min(max(lat, south), north)
+            near_lon = min(max(lon, west), east)
+            if haversine_m(lat, lon, near_lat, near_lon) <= radius:
+                tiles.append((x, y))
+    return tiles
+
+def tiles_in_bbox(south, west, north, east, zoom):
+    x_min, y_min = latlon_to_tile(north, west, zoom)
+    x_max, y_max = latlon_to_tile(south, east, zoom)
+    return [(x, y) for y in range(y_min, y_max + 1) for x in range(x_min, x_max + 1)]
+
+# --- ĐƠN GIẢN HÓA ĐƯỜNG ĐI ---
+def meters_per_pixel(lat, zoom):
+    """Số mét trên một pixel của bản đồ Web Mercator (ô 256px) tại vĩ độ lat."""
+    return 2 * math.pi * EARTH_RADIUS_M * math.cos(math.radians(lat)) / (256 * 2 ** zoom)
+
+def fit_zoom(path, pixels=600, max_zoom=18):
+    """Mức zoom lớn nhất mà cả bbox của đường đi nằm gọn trong pixels điểm ảnh (như fit_bounds)."""
+    pts = np.asarray(path, dtype=np.float64)
+    if not len(pts): return max_zoom
+    lat = float(pts[:, 0].mean())
+    span_m = max(
+        (pts[:, 0].max() - pts[:, 0].min()) * METERS_PER_DEG_LAT,
+        (pts[:, 1].max() - pts[:, 1].min()) * METERS_PER_DEG_LAT * math.cos(math.radians(lat)),
+    )
+    for zoom in range(max_zoom, 0, -1):
+        if span_m <= pixels * meters_per_pixel(lat, zoom): return zoom
+    return 0
+
+def simplify_path(path, tolerance_m):
+    """Douglas-Peucker trên danh sách [lat, lon]: bỏ các điểm lệch khỏi đoạn thẳng nối hai đầu
+    ít hơn tolerance_m mét. Nhận list hoặc mảng (n, 2); luôn giữ điểm đầu/cuối, trả về list
+    [lat, lon] theo thứ tự cũ.
+    """
+    pts = np.asarray(path, dtype=np.float64)
+    if len(pts) < 3 or tolerance_m <= 0: return pts.tolist()
+    # Chiếu phẳng quanh điểm đầu (đủ chính xác trong phạm vi một thành phố)
+    xy = np.empty_like(pts)
+    xy[:, 0] = (pts[:, 1] - pts[0, 1]) * METERS_PER_DEG_LAT * math.cos(math.radians(pts[0, 0]))
+    xy[:, 1] = (pts[:, 0] - pts[0, 0]) * METERS_PER_DEG_LAT
+
+    keep = np.zeros(len(pts), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(pts) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2: continue
+        seg = xy[last] - xy[first]
+        rel = xy[first + 1:last] - xy[first]
+        seg_len = math.hypot(seg[0], seg[1])
+        if seg_len == 0:
+            dists = np.hypot(rel[:, 0], rel[:, 1])
+        else:
+            dists = np.abs(seg[0] * rel[:, 1] - seg[1] * rel[:, 0]) / seg_len
+        i = int(np.argmax(dists))
+        if dists[i] > tolerance_m:
+            mid = first + 1 + i
+            keep[mid] = True
+            stack.append((first, mid))
+            stack.append((mid, last))
+    return pts[keep].tolist()
+
+# --- ĐA GIÁC (ISOCHRONE) ---
+def offset_point(lat, lon, bearing_deg, distance_m):
+    """Điểm cách (lat, lon) distance_m mét theo hướng bearing_deg (xấp xỉ phẳng, đủ cho vài km)."""
+    b = math.radians(bearing_deg)
+    dlat = distance_m * math.cos(b) / METERS_PER_DEG_LAT
+    dlon = distance_m * math.sin(b) / (METERS_PER_DEG_LAT * max(math.cos(math.radians(lat)), 1e-6))
+    return lat + dlat, lon + dlon
+
+def points_in_polygon(lats, lons, polygon):
+    """Mảng bool: điểm nào nằm trong đa giác [(lat, lon), ...] (ray casting, vector hóa theo điểm)."""
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    inside = np.zeros(lats.shape, dtype=bool)
+    n = len(polygon)
+    for i in range(n):
+        lat1, lon1 = polygon[i]
+        lat2, lon2 = polygon[(i + 1) % n]
+        if lat1 == lat2: continue
+        crosses = (lat1 > lats) != (lat2 > lats)
+        lon_at = lon1 + (lats - lat1) * (lon2 - lon1) / (lat2 - lat1)
+        inside ^= crosses & (lons < lon_at)
+    return inside
@@ -0,0 +1,106 @@
+# json_stream.py
+import codecs
+import json
+
+DECODER = json.JSONDecoder()
+WHITESPACE = " \t\n\r"
+# Ký tự hợp lệ ngay sau một giá trị hoàn chỉnh; nếu chưa thấy thì số có thể còn bị cắt giữa chunk
+VALUE_END = WHITESPACE + ",:]}"
+TRIM_AT = 1 << 16
+
+
+class JSONStream:
+    """Bộ đệm đọc dần các chunk bytes, giải mã từng giá trị JSON khi đã đủ dữ liệu."""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        if self.eof: return False
+        for chunk in self.chunks:
+            if not chunk: continue
+            text = self.decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+            if self.pos > TRIM_AT:
+                self.buf = self.buf[self.pos:]
+                self.pos = 0
+            self.buf += text
+            return True
+        self.buf += self.decoder.decode(b"", final=True)
+        self.eof = True
+        return False
+
+    def peek(self):
+        """Ký tự có nghĩa tiếp theo (bỏ khoảng trắng), hoặc "" khi hết dữ liệu."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf): return self.buf[self.pos]
+            if not self.fill(): return ""
+
+    def expect(self, ch):
+        if self.peek() != ch:
+            raise ValueError(f"JSON không hợp lệ: cần '{ch}' tại vị trí {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        """Giải mã trọn một giá trị; chỉ chấp nhận khi đã thấy ký tự kết thúc phía sau (tránh cắt đôi số) hoặc đã EOF."""
+        self.peek()
+        while True:
+            try:
+                value, end = DECODER.raw_decode(self.buf, self.pos)
+                if (end < len(self.buf) and self.buf[end] in VALUE_END) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof: raise
+            self.fill()
+
+
+def iter_array_items(chunks, key="elements", others=None):
+    """Lần lượt trả về từng phần tử của mảng `key` ở cấp ngoài cùng của một object JSON.
+
+    Chỉ giữ trong bộ nhớ phần tử đang xử lý, không nạp cả tài liệu (dùng cho phản hồi
+    Overpass lớn hoặc file dump vài trăm MB). Nếu truyền dict others, các khóa cấp ngoài
+    cùng còn lại (vd. "remark" của Overpass, thường nằm SAU mảng) được ghi vào đó.
+    """
+    stream = JSONStream(chunks)
+    stream.expect("{")
+    if stream.peek() == "}": return
+
+    while True:
+        name = stream.value()
+        stream.expect(":")
+        if name == key:
+            stream.expect("[")
+            if stream.peek() == "]":
+                stream.pos += 1
+            else:
+                while True:
+                    yield stream.value()
+                    if stream.peek() == ",":
+                        stream.pos += 1
+                        continue
+                    stream.expect("]")
+                    break
+        else:
+            value = stream.value()
+            if others is not None:
+                others[name] = value
+
+        if stream.peek() == ",":
+            stream.pos += 1
+            continue
+        stream.expect("}")
+        return
+
+
+def iter_file_chunks(path, chunk_size=1 << 16):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk: return
+            yield chunk
@@ -0,0 +1,20 @@
+# polyline.py
+import numpy as np
+
+
+def decode_polyline(encoded, precision=6):
+    """Giải mã chuỗi encoded polyline (Google/OSRM, polyline6 mặc định) thành mảng NumPy (n, 2) [lat, lon].
+
+    Giải mã vector hóa toàn bộ chuỗi một lần thay vì vòng lặp từng ký tự trong Python.
+    """
+    if not encoded: return np.empty((0, 2))
+    chunks = np.frombuffer(encoded.encode("ascii"), dtype=np.uint8).astype(np.int64) - 63
+    # Mỗi số kết thúc ở nhóm 5 bit không có cờ nối tiếp 0x20
+    ends = np.flatnonzero((chunks & 0x20) == 0)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    shift = 5 * (np.arange(len(chunks)) - np.repeat(starts, ends - starts + 1))
+    values = np.add.reduceat((chunks & 0x1f) << shift, starts)
+    # Bỏ mã zigzag để lấy lại số có dấu, rồi cộng dồn độ lệch giữa các điểm
+    deltas = (values >> 1) ^ -(values & 1)
+    return np.cumsum(deltas.reshape(-1, 2), axis=0) / 10.0 ** precision
+
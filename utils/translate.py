@@ -1,33 +1,89 @@
 #  utils.py
+import threading
+import time
 import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
 from deep_translator import GoogleTranslator
-from config.config import BASE_TEXTS
+from config.config import (
+    BASE_TEXTS, TRANSLATION_CACHE_PATH, TRANSLATION_TIMEOUT, TRANSLATION_WORKERS, TRANSLATION_RETRY_AFTER,
+    CATALOG_DIR
+)
+from utils.catalogs import load_catalog, placeholders
+from utils.translation_cache import TranslationCache, translate_many
 
 # --- DỊCH THUẬT CƠ BẢN ---
+THREAD_TRANSLATORS = threading.local()
+
+def get_translator(target_lang='en', source_lang='vi'):
+    """GoogleTranslator dùng lại trong mỗi luồng (đối tượng giữ tham số của request đang chạy
+    nên không chia sẻ giữa các luồng dịch song song)."""
+    target_api = 'zh-CN' if target_lang == 'zh' else target_lang
+    translators = THREAD_TRANSLATORS.__dict__
+    key = (source_lang, target_api)
+    if key not in translators:
+        translators[key] = GoogleTranslator(source=source_lang, target=target_api)
+    return translators[key]
+
+@st.cache_resource
+def get_translation_cache():
+    # Dùng chung mọi session: session mới không phải dịch lại những gì đã dịch
+    return TranslationCache(TRANSLATION_CACHE_PATH)
+
 @st.cache_resource
-def get_translator():
-    return GoogleTranslator(source='vi', target='en')
+def get_translate_executor():
+    return ThreadPoolExecutor(max_workers=TRANSLATION_WORKERS, thread_name_prefix="translate")
+
+# Ngôn ngữ vừa dịch lỗi/quá hạn -> thời điểm; tạm không thử lại để trang không chậm theo từng nhãn
+FAILED_AT = {}
+
+def translate_texts(texts, target_lang, source_lang='vi'):
+    """Dịch nhiều chuỗi một lượt (gộp lô, song song, có timeout), trả về list cùng thứ tự.
+    Chuỗi chưa dịch được giữ nguyên văn bản gốc."""
+    if target_lang == source_lang: return list(texts)
+    cache = get_translation_cache()
+    missing = list(dict.fromkeys(t for t in texts if t and cache.get(t, target_lang) is None))
+
+    def save(found):
+        # Bản dịch làm hỏng chỗ điền của .format() thì giữ câu gốc
+        cache.set_many([(t, tr if placeholders(tr) == placeholders(t) else t) for t, tr in found.items()], target_lang)
 
-def translate_text(text, target_lang, source_lang='vi'):
-    if target_lang == source_lang or not text: return text
-    target_lang_api = 'zh-CN' if target_lang == 'zh' else target_lang
-    try:
-        return GoogleTranslator(source=source_lang, target=target_lang_api).translate(text)
-    except Exception:
-        return text
+    if missing and time.monotonic() - FAILED_AT.get(target_lang, float("-inf")) >= TRANSLATION_RETRY_AFTER:
+        # Lô về trễ (mạng chậm) vẫn được ghi vào cache khi xong, lần sau không phải dịch lại
+        found = translate_many(
+            missing, lambda: get_translator(target_lang, source_lang).translate,
+            get_translate_executor(), TRANSLATION_TIMEOUT, on_late=save
+        )
+        save(found)
+        if len(found) < len(missing):
+            FAILED_AT[target_lang] = time.monotonic()
+
+    return [cache.get(t, target_lang) or t for t in texts]
+
+# Catalog đã nạp cho cả tiến trình; dict thường thay vì st.cache_resource vì get_text được gọi
+# hàng trăm lần mỗi lần rerun
+CATALOGS = {}
+
+def get_catalog(lang):
+    catalog = CATALOGS.get(lang)
+    if catalog is None:
+        catalog = CATALOGS[lang] = load_catalog(lang)
+        if not catalog:
+            print(f"Chưa có bản dịch dựng sẵn cho '{lang}' trong {CATALOG_DIR}, nhãn sẽ dịch qua mạng. "
+                  f"Chạy: python -m utils.catalogs")
+    return catalog
 
 def get_text(key, lang="vi"):
-    # Cache đơn giản để không dịch đi dịch lại các nhãn tĩnh
-    if "translations_cache" not in st.session_state: 
-        st.session_state.translations_cache = {}
-        
-    cache_key = f"{key}_{lang}"
-    if cache_key in st.session_state.translations_cache: 
-        return st.session_state.translations_cache[cache_key]
-    
+    if lang == "vi": return BASE_TEXTS.get(key, key)
+
+    # Bản dịch dựng sẵn: chỉ tra dict, không gọi mạng
+    catalog = get_catalog(lang)
+    if key in catalog: return catalog[key]
+
     base_text = BASE_TEXTS.get(key, key)
-    
-    translated = base_text if lang == "vi" else translate_text(base_text, lang, 'vi')
-    
-    st.session_state.translations_cache[cache_key] = translated
-    return translated
\ No newline at end of file
+    cached = get_translation_cache().get(base_text, lang)
+    if cached is not None: return cached
+
+    # Nhãn chưa có trong catalog: dịch một lượt mọi nhãn còn thiếu của ngôn ngữ này
+    # (một round trip) thay vì lần lượt từng nhãn khi trang render
+    missing = [text for k, text in BASE_TEXTS.items() if k not in catalog]
+    return translate_texts(missing + [base_text], lang)[-1]
@@ -0,0 +1,109 @@
+# translation_cache.py
+import os
+import sqlite3
+import threading
+from concurrent.futures import wait
+
+# Google (bản miễn phí qua deep_translator) nhận tối đa 5000 ký tự mỗi request
+MAX_CHARS_PER_REQUEST = 4500
+SEPARATOR = "\n"
+
+
+class TranslationCache:
+    """Cache bản dịch dùng chung mọi session, khóa (text, lang); tùy chọn lưu xuống SQLite.
+
+    Bản dịch của một ngôn ngữ được nạp từ đĩa vào RAM ở lần dùng đầu tiên, sau đó mọi lần
+    tra chỉ là truy cập dict.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.memory = {}
+        self.loaded = set()
+        self.conn = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations (lang TEXT, text TEXT, translated TEXT, PRIMARY KEY (lang, text))")
+
+    def load_lang(self, lang):
+        if lang in self.loaded: return
+        with self.lock:
+            if lang in self.loaded: return
+            if self.conn:
+                for text, translated in self.conn.execute(
+                        "SELECT text, translated FROM translations WHERE lang = ?", (lang,)):
+                    self.memory[(text, lang)] = translated
+            self.loaded.add(lang)
+
+    def get(self, text, lang):
+        self.load_lang(lang)
+        return self.memory.get((text, lang))
+
+    def set_many(self, pairs, lang):
+        """pairs: danh sách (text, translated)."""
+        with self.lock:
+            for text, translated in pairs:
+                self.memory[(text, lang)] = translated
+            if self.conn and pairs:
+                with self.conn:
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO translations (lang, text, translated) VALUES (?, ?, ?)",
+                        [(lang, t, tr) for t, tr in pairs])
+
+
+def split_batches(texts, max_chars=MAX_CHARS_PER_REQUEST):
+    """Gom các chuỗi thành lô, mỗi lô nối bằng SEPARATOR không quá max_chars ký tự."""
+    batches, batch, size = [], [], 0
+    for text in texts:
+        if batch and size + len(text) + 1 > max_chars:
+            batches.append(batch)
+            batch, size = [], 0
+        batch.append(text)
+        size += len(text) + 1
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def translate_joined(translate, batch):
+    """Dịch cả lô trong MỘT request bằng cách nối các dòng; nếu số dòng trả về lệch thì dịch từng chuỗi."""
+    if len(batch) > 1 and not any(SEPARATOR in t for t in batch):
+        result = translate(SEPARATOR.join(batch))
+        lines = result.split(SEPARATOR) if result else []
+        if len(lines) == len(batch):
+            return [line.strip() for line in lines]
+    return [translate(t) for t in batch]
+
+
+def batch_results(future):
+    """dict text -> bản dịch của một lô đã xong, rỗng nếu lô lỗi."""
+    try:
+        batch, translated = future.result()
+    except Exception as e:
+        print(f"Translate Error: {e}")
+        return {}
+    return {t: tr for t, tr in zip(batch, translated) if tr}
+
+
+def translate_many(texts, translate_for_thread, executor, timeout, on_late=None):
+    """Dịch nhiều chuỗi: các lô chạy song song trên executor, chờ tối đa timeout giây.
+
+    translate_for_thread() trả về hàm translate(text) dùng được trong luồng hiện tại.
+    Trả về dict text -> bản dịch cho các lô hoàn thành kịp; lô lỗi bị bỏ qua. Lô quá hạn vẫn
+    chạy tiếp, xong thì kết quả được chuyển cho on_late(dict) (ví dụ để ghi vào cache).
+    """
+    def run(batch):
+        return batch, translate_joined(translate_for_thread(), batch)
+
+    futures = [executor.submit(run, batch) for batch in split_batches(texts)]
+    done, pending = wait(futures, timeout=timeout)
+    results = {}
+    for future in done:
+        results.update(batch_results(future))
+    if on_late:
+        for future in pending:
+            future.add_done_callback(lambda f: on_late(batch_results(f)))
+    return results
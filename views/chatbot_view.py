@@ -101,9 +101,9 @@ def render_chatbot_tab(lang):
         search_context = "\n\n[DỮ LIỆU TÌM KIẾM TỪ BẢN ĐỒ]:\n"
         for i, r in enumerate(top_results):
             
-            dist = int(r.get('distance_sort', 0))
+            dist = int(r.best_distance)
             
-            search_context += f"{i+1}. {r['name']} | Giá: {r['price']} | Loại: {r['cuisine']} | Cách: {dist}m\n"
+            search_context += f"{i+1}. {r.name} | Giá: {r.price} | Loại: {r.cuisine_label} | Cách: {dist}m\n"
     else:
         search_context = "\n(Người dùng chưa tìm kiếm quán nào trên bản đồ)."
 
@@ -7,15 +7,19 @@ from streamlit_js_eval import get_geolocation
 import math
 from utils.translate import get_text
 from services.route_service import get_route
-from views.map_logic import calculate_time_minutes
+from services.osm_service import suggest_places
+from views.map_logic import calculate_time_minutes, duration_minutes
+from utils.geo import fit_zoom, meters_per_pixel, simplify_path
+from config.config import ROUTE_SIMPLIFY_PIXELS, ROUTE_SIMPLIFY_EXTRA_ZOOM, MAP_ZOOM_START, TOUR_MIN_STOPS, TOUR_MAX_STOPS, BUDGET_OPTIONS
 
 def render_settings(lang):
     """Hiển thị panel cài đặt"""
     user_lat, user_lon = None, None
     city_input = "Ho Chi Minh City"
     selected_mode_api = "driving"
-    selected_budget = None
+    selected_budget = "all"
     radius = 3000
+    max_minutes = None
     use_location = True
 
     with st.expander("⚙️ " + get_text("settings", lang), expanded=False):
@@ -31,6 +35,10 @@ def render_settings(lang):
                     st.success("GPS OK!")
             else:
                 city_input = st.text_input(get_text("enter_location", lang), value="Đại học Khoa học Tự Nhiên")
+                # Gợi ý từ chỉ mục địa điểm cục bộ; chọn gợi ý thì geocode không cần gọi mạng
+                names = [name for name, _, _, _ in suggest_places(city_input) if name != city_input]
+                if names:
+                    city_input = st.selectbox(get_text("location_suggestions", lang), [city_input] + names)
         
         with col2:
             label_transport = get_text("transport_mode", lang)
@@ -43,21 +51,22 @@ def render_settings(lang):
             selected_mode_api = travel_modes[selected_mode_label]
 
         with col3:
-            budget_options = [
-                get_text("budget_all", lang),
-                get_text("budget_cheap", lang),
-                get_text("budget_medium", lang),
-                get_text("budget_expensive", lang)
-            ]
-            selected_budget = st.selectbox(get_text("budget", lang), budget_options)
+            selected_budget = st.selectbox(
+                get_text("budget", lang), list(BUDGET_OPTIONS.keys()),
+                format_func=lambda code: get_text(BUDGET_OPTIONS[code], lang)
+            )
 
         with col4:
-            radius = st.slider(get_text("radius", lang), 500, 5000, 3000, step=500)
+            if st.checkbox(get_text("search_by_time", lang), value=False):
+                max_minutes = st.slider(get_text("max_minutes", lang), 5, 30, 10, step=5)
+            else:
+                radius = st.slider(get_text("radius", lang), 500, 5000, 3000, step=500)
             
     return {
         "user_lat": user_lat, "user_lon": user_lon,
         "use_location": use_location, "city_input": city_input,
-        "mode": selected_mode_api, "budget": selected_budget, "radius": radius
+        "mode": selected_mode_api, "budget": selected_budget, "radius": radius,
+        "max_minutes": max_minutes
     }
 
 def render_results_list(results, mode):
@@ -92,20 +101,25 @@ def render_results_list(results, mode):
     center_coords = st.session_state.get("center_coords")
 
     for idx, r in enumerate(results):
-        is_selected = (str(st.session_state.get('selected_place_id')) == str(r['id']))
+        is_selected = (str(st.session_state.get('selected_place_id')) == str(r.id))
 
         # --- LOGIC TÍNH KHOẢNG CÁCH & THỜI GIAN TRONG LIST ---
         if is_selected and center_coords:
-            path, real_dist, _, _ = get_route(
-                center_coords[0], center_coords[1], r['lat'], r['lon'], mode, lang=lang
+            path, real_dist, real_dur, _ = get_route(
+                center_coords[0], center_coords[1], r.lat, r.lon, mode, lang=lang
             )
-            final_dist = real_dist if path else r['distance_sort']
+            final_dist = real_dist if len(path) else r.best_distance
+            final_dur = real_dur if len(path) else None
+            dist_label = f"{int(final_dist)}m"
+        elif r.travel_distance is not None:
+            final_dist, final_dur = r.travel_distance, r.travel_duration
             dist_label = f"{int(final_dist)}m"
         else:
-            final_dist = r['distance_sort']
+            final_dist, final_dur = r.distance_sort, None
             dist_label = f"~{int(final_dist)}m"
 
-        est_time_min = calculate_time_minutes(final_dist, mode)
+        # Có thời gian thật (OSRM/router cục bộ) thì hiện đúng thời gian đó, không thì ước lượng theo vận tốc trung bình
+        est_time_min = duration_minutes(final_dur) if final_dur is not None else calculate_time_minutes(final_dist, mode)
         time_display_str = f"{est_time_min} phút"
 
         if is_selected:
@@ -178,7 +192,7 @@ def render_results_list(results, mode):
                             color: {name_color};
                             margin-bottom: 0.35rem;
                             line-height: 1.3;
-                        ">{r['name']}</div>
+                        ">{r.name}</div>
                         <div style="
                             display: flex;
                             align-items: center;
@@ -188,11 +202,11 @@ def render_results_list(results, mode):
                             margin-bottom: 0.5rem;
                         ">
                             <span style="display: flex; align-items: center; gap: 0.2rem;">
-                                <span style="color: #fbbf24;">★</span> {r['rating']}
-                                <span style="color: #94a3b8; font-size: 0.75rem;">({r['reviews']})</span>
+                                <span style="color: #fbbf24;">★</span> {r.rating}
+                                <span style="color: #94a3b8; font-size: 0.75rem;">({r.reviews})</span>
                             </span>
                             <span>•</span>
-                            <span style="color: {'#34d399' if is_dark else '#10b981'}; font-weight: 500;">{r['price']}</span>
+                            <span style="color: {'#34d399' if is_dark else '#10b981'}; font-weight: 500;">{r.price}</span>
                         </div>
                         <div style="display: flex; gap: 0.5rem; flex-wrap: wrap;">
                             <span style="
@@ -218,35 +232,72 @@ def render_results_list(results, mode):
             """, unsafe_allow_html=True
         )
 
-        def select_place(pid=r['id']):
+        def select_place(pid=r.id):
             st.session_state.selected_place_id = str(pid)
 
         btn_label = get_text("go_to_place_btn", lang).format(idx+1)
-        st.button(btn_label, key=f"btn_{r['id']}", on_click=select_place, use_container_width=True)
+        st.button(btn_label, key=f"btn_{r.id}", on_click=select_place, use_container_width=True)
+
+def render_result_filters(index, lang):
+    """Bộ lọc cuisine lấy từ facet của toàn bộ kết quả đã tải, trả về mã cuisine ("all" = không lọc)"""
+    options = ["all"] + [value for value, _ in index.values("cuisine")]
+    counts = dict(index.values("cuisine"))
+    return st.selectbox(
+        get_text("cuisine_filter", lang), options, key="cuisine_filter",
+        format_func=lambda c: get_text("budget_all", lang) if c == "all" else f"{c} ({counts[c]})"
+    )
+
+def render_tour_picker(results, lang):
+    """Chọn các quán cho food tour, trả về danh sách POI đã chọn"""
+    names = {str(r.id): f"{idx+1}. {r.name}" for idx, r in enumerate(results)}
+    picked = st.multiselect(
+        get_text("tour_pick", lang).format(TOUR_MIN_STOPS, TOUR_MAX_STOPS),
+        list(names.keys()), format_func=names.get,
+        max_selections=TOUR_MAX_STOPS, key="tour_place_ids"
+    )
+    if 0 < len(picked) < TOUR_MIN_STOPS:
+        st.caption(get_text("tour_need_more", lang).format(TOUR_MIN_STOPS))
+    by_id = {str(r.id): r for r in results}
+    return [by_id[pid] for pid in picked if pid in by_id]
+
+def route_color_for(mode):
+    if mode == "driving": return "#3388ff"
+    if mode == "walking": return "#4CAF50"
+    return "#eb1509"
+
+def simplify_for_map(path):
+    """Rút gọn đường đi với sai số chỉ phụ thuộc chính lộ trình, không theo zoom đang xem:
+    st_folium khóa component theo nội dung script, nếu đường đổi theo mỗi lần zoom thì bản đồ
+    bị dựng lại và nhảy về zoom_start.
+    """
+    if not len(path): return []
+    zoom = max(fit_zoom(path), MAP_ZOOM_START) + ROUTE_SIMPLIFY_EXTRA_ZOOM
+    lat = float(path[0][0])
+    return simplify_path(path, ROUTE_SIMPLIFY_PIXELS * meters_per_pixel(lat, zoom))
 
-def render_map(center_lat, center_lon, results, mode):
-    """Hiển thị bản đồ Folium và đường đi thực tế"""
+def render_map(center_lat, center_lon, results, mode, tour=None):
+    """Hiển thị bản đồ Folium và đường đi thực tế (hoặc lộ trình food tour nếu có)"""
     lang = st.session_state.get("language", "vi")
 
-    m = folium.Map(location=[center_lat, center_lon], zoom_start=15)
+    m = folium.Map(location=[center_lat, center_lon], zoom_start=MAP_ZOOM_START)
     folium.Marker([center_lat, center_lon], icon=folium.Icon(color='red', icon='user', prefix='fa'), popup=get_text("you", lang)).add_to(m)
     
-    selected_place = next((x for x in results if str(x['id']) == str(st.session_state.get('selected_place_id'))), None)
+    selected_place = next((x for x in results if str(x.id) == str(st.session_state.get('selected_place_id'))), None)
     
     for r in results:
-        is_selected = (selected_place and str(r['id']) == str(selected_place['id']))
+        is_selected = (selected_place and str(r.id) == str(selected_place.id))
         color = 'green' if is_selected else 'blue'
         
         popup_html = f"""
         <div style="font-family: sans-serif; width: 200px;">
-            <h4 style="margin: 0 0 5px 0;">{r['name']}</h4>
-            <p style="margin: 0; font-size: 0.9em;">⭐ {r['rating']} | 💬 {r['reviews']}</p>
-            <p style="margin: 0; font-size: 0.9em; color: #666;">{r['address']}</p>
+            <h4 style="margin: 0 0 5px 0;">{r.name}</h4>
+            <p style="margin: 0; font-size: 0.9em;">⭐ {r.rating} | 💬 {r.reviews}</p>
+            <p style="margin: 0; font-size: 0.9em; color: #666;">{r.address}</p>
         </div>
         """
         marker = folium.Marker(
-            [r['lat'], r['lon']],
-            tooltip=f"{r['name']}",
+            [r.lat, r.lon],
+            tooltip=f"{r.name}",
             popup=folium.Popup(popup_html, max_width=250),
             icon=folium.Icon(color=color, icon='cutlery', prefix='fa')
         )
@@ -256,35 +307,60 @@ def render_map(center_lat, center_lon, results, mode):
     display_dist_m = 0
     display_time_min = 0
         
-    if selected_place:
+    # Vùng đi tới được khi tìm theo thời gian di chuyển
+    isochrone = st.session_state.get("isochrone")
+    if isochrone:
+        folium.Polygon(
+            locations=isochrone, color=route_color_for(mode), weight=2, fill=True, fill_opacity=0.08
+        ).add_to(m)
+
+    if tour:
+        plugins.AntPath(
+            locations=simplify_for_map(tour["path"]), dash_array=[10, 20], delay=1000,
+            color=route_color_for(mode), pulse_color='#FFFFFF', weight=6, opacity=0.8
+        ).add_to(m)
+        for order, stop in enumerate(tour["stops"], 1):
+            folium.Marker(
+                [stop.lat, stop.lon], tooltip=get_text("tour_stop", lang).format(order, stop.name),
+                icon=folium.DivIcon(icon_size=(26, 26), icon_anchor=(13, 13), html=f"""<div style="background:#FF6B6B;color:white;width:26px;height:26px;
+                    border-radius:13px;text-align:center;line-height:26px;font-weight:700;">{order}</div>""")
+            ).add_to(m)
+    elif selected_place:
         # Gọi API lấy đường đi thực tế
         path, real_dist, real_dur_api, steps = get_route(
-            center_lat, center_lon, selected_place['lat'], selected_place['lon'], 
+            center_lat, center_lon, selected_place.lat, selected_place.lon, 
             mode=mode, lang=lang
         )
         
-        if path:
-            if mode == "driving": route_color = "#3388ff" 
-            elif mode == "walking": route_color = "#4CAF50" 
-            else: route_color = "#eb1509" 
-
+        if len(path):
             plugins.AntPath(
-                locations=path, dash_array=[10, 20], delay=1000, color=route_color,
+                locations=simplify_for_map(path), dash_array=[10, 20], delay=1000, color=route_color_for(mode),
                 pulse_color='#FFFFFF', weight=6, opacity=0.8
             ).add_to(m)
             
             steps_to_display = steps
             display_dist_m = real_dist 
-            display_time_min = calculate_time_minutes(display_dist_m, mode)
+            display_time_min = duration_minutes(real_dur_api)
             
         else:
-            display_dist_m = selected_place['distance_sort']
+            display_dist_m = selected_place.best_distance
             display_time_min = calculate_time_minutes(display_dist_m, mode)
 
         if steps_to_display and isinstance(steps_to_display, list) and steps_to_display[0].get('approximate'):
             st.info(get_text('real_route_unavailable', lang))
     
     st_folium(m, width="100%", height=600)
+
+    # === HIỂN THỊ FOOD TOUR ===
+    if tour:
+        st.markdown(f"### {get_text('tour_title', lang)}")
+        c1, c2 = st.columns(2)
+        tour_dist = tour["distance"]
+        dist_str = f"{tour_dist/1000:.1f} km" if tour_dist > 1000 else f"{int(tour_dist)} m"
+        c1.metric(get_text("actual_dist", lang), dist_str)
+        c2.metric(get_text("est_time", lang), f"{calculate_time_minutes(tour_dist, mode)} min")
+        for order, stop in enumerate(tour["stops"], 1):
+            st.markdown(f"**{get_text('tour_stop', lang).format(order, stop.name)}**")
     
     # === HIỂN THỊ CHI TIẾT LỘ TRÌNH ===
     if steps_to_display:
@@ -1,34 +1,38 @@
 # views/map_logic.py
 import random
 import math
-from geopy.distance import geodesic
-from utils.translate import get_text
+from utils.geo import distances_to
+from services.route_service import get_travel_matrix, travel_speed
+from config.config import TRAVEL_RANK_SECONDS
 
 # --- LOGIC TÍNH TOÁN VẬN TỐC & THỜI GIAN ---
 def get_velocity(mode):
     """Trả về vận tốc (m/s) theo chế độ di chuyển"""
-    if mode == "walking": return 1.2      
-    elif mode == "bicycling" or mode == "cycling": return 3.5 
-    else: return 7.0                     
+    return travel_speed(mode)
 
 def calculate_time_minutes(distance_meters, mode):
     """Công thức: Thời gian (phút) = Quãng đường (m) / Vận tốc (m/s)"""
     velocity = get_velocity(mode)
     seconds = distance_meters / velocity
-    minutes = int(seconds / 60)
-    return max(1, minutes)
+    return duration_minutes(seconds)
+
+def duration_minutes(seconds):
+    """Số phút hiển thị cho một thời gian di chuyển (giây), ít nhất 1 phút"""
+    return max(1, int(seconds / 60))
 
 # --- LOGIC XỬ LÝ DỮ LIỆU ---
-def process_results(raw_results, center_lat, center_lon, budget, lang):
-    """Xử lý dữ liệu thô: tính khoảng cách sơ bộ để sort, tạo dữ liệu giả lập (rating, price)"""
+def process_results(raw_results, center_lat, center_lon):
+    """Xử lý dữ liệu thô: tính khoảng cách sơ bộ để sort, tạo dữ liệu giả lập (rating, price).
+
+    Trả về toàn bộ danh sách đã xếp theo điểm; lọc ngân sách/cuisine và cắt top 15 làm sau
+    bằng FacetIndex (filter_results) để đổi bộ lọc không phải xử lý lại.
+    """
     processed = []
-    for place in raw_results:
-        tags = place.get('tags', {})
-        name = tags.get('name', "Quán không tên")
-        place_id = place['id']
-        
-        # Khoảng cách Geodesic dùng để sắp xếp danh sách ban đầu
-        d = geodesic((center_lat, center_lon), (place['lat'], place['lon'])).meters
+    # Khoảng cách haversine tính một lần cho cả danh sách, dùng để sắp xếp ban đầu
+    distances = distances_to(center_lat, center_lon, raw_results)
+    for place, d in zip(raw_results, distances.tolist()):
+        name = place.name or "Quán không tên"
+        place_id = place.id
         
         random.seed(place_id) 
         simulated_rating = round(random.uniform(3.5, 5.0), 1)
@@ -36,24 +40,41 @@ def process_results(raw_results, center_lat, center_lon, budget, lang):
         price_opts = ["$", "$", "$$", "$$", "$$$"] 
         simulated_price = random.choice(price_opts)
 
-        is_match_budget = True
-        if budget == get_text("budget_cheap", lang) and simulated_price != "$": is_match_budget = False
-        elif budget == get_text("budget_medium", lang) and simulated_price != "$$": is_match_budget = False
-        elif budget == get_text("budget_expensive", lang) and simulated_price != "$$$": is_match_budget = False
-        
-        if not is_match_budget: continue
-
         score = simulated_rating * math.log(1 + simulated_reviews)
-        cuisine = tags.get('cuisine', tags.get('amenity', 'shop'))
-        address = place.get('address', 'Đang cập nhật địa chỉ')
-
-        processed.append({
-            "id": place_id, "name": name, "lat": place['lat'], "lon": place['lon'],
-            "cuisine": cuisine, "price": simulated_price, "rating": simulated_rating,
-            "reviews": simulated_reviews, "score": score,
-            "distance_sort": d, 
-            "address": address
-        })
+
+        # POI là tuple bất biến: tạo bản mới chứa điểm xếp hạng, không sửa bản ghi trong cache
+        processed.append(place._replace(
+            name=name, price=simulated_price, rating=simulated_rating,
+            reviews=simulated_reviews, score=score, distance_sort=d
+        ))
     
-    processed.sort(key=lambda x: x['score'], reverse=True)
-    return processed[:15]
\ No newline at end of file
+    processed.sort(key=lambda x: x.score, reverse=True)
+    return processed
+
+def filter_results(index, budget="all", cuisine="all", limit=15):
+    """Lọc trên FacetIndex theo mã ngân sách ("all", "$", "$$", "$$$") và mã cuisine"""
+    return index.filter(
+        price=None if budget == "all" else budget,
+        cuisine=None if cuisine == "all" else cuisine,
+        limit=limit
+    )
+
+def travel_rank(place):
+    """Khóa xếp hạng khi đã có thời gian thực tế: quán không tới được xuống cuối, còn lại theo
+    điểm giảm dần theo thời gian di chuyển (quán ngon nhưng phải vòng xa tụt hạng)."""
+    if place.travel_duration is None: return (1, 0.0)
+    if not TRAVEL_RANK_SECONDS: return (0, -place.score)
+    return (0, -place.score / (1 + place.travel_duration / TRAVEL_RANK_SECONDS))
+
+def apply_travel_matrix(results, center_lat, center_lon, mode):
+    """Gắn quãng đường/thời gian thực tế cho mọi quán bằng một request OSRM table và xếp lại
+    theo travel_rank (điểm kết hợp thời gian di chuyển)."""
+    distances, durations = get_travel_matrix(center_lat, center_lon, [(r.lat, r.lon) for r in results], mode)
+    if distances is None: return results
+
+    updated = [
+        r._replace(travel_distance=dist, travel_duration=dur)
+        for r, dist, dur in zip(results, distances, durations)
+    ]
+    updated.sort(key=travel_rank)
+    return updated
@@ -3,8 +3,15 @@ import streamlit as st
 from utils.translate import get_text
 from services.osm_service import geocode, get_restaurants_from_osm
 from services.search_engine import is_known_food_term
-from views.map_components import render_settings, render_results_list, render_map, render_home_page
-from views.map_logic import process_results
+from services.route_service import prefetch_routes, travel_speed
+from services.tour_planner import plan_tour
+from services.isochrone import get_isochrone, places_in_isochrone
+from config.config import TOUR_MIN_STOPS, ISOCHRONE_MAX_RADIUS
+from views.map_components import (
+    render_settings, render_results_list, render_map, render_home_page, render_tour_picker, render_result_filters
+)
+from views.map_logic import process_results, filter_results, apply_travel_matrix
+from services.facets import FacetIndex
 
 def render_map_tab(lang):
     # --- GIAO DIỆN TÌM KIẾM ---
@@ -45,6 +52,10 @@ def render_map_tab(lang):
     # --- XỬ LÝ TÌM KIẾM ---
     if search_btn:
         st.session_state.selected_place_id = None
+        # Lộ trình tải trước cho lần tìm kiếm cũ không còn cần nữa
+        if st.session_state.get("route_prefetch"):
+            st.session_state.route_prefetch.cancel()
+            st.session_state.route_prefetch = None
         center_lat, center_lon = None, None
         
         if settings['use_location'] and settings['user_lat']:
@@ -58,12 +69,29 @@ def render_map_tab(lang):
 
         if center_lat and dish_input:
             with st.spinner(get_text("searching", lang).format(dish_input)):
-                raw_results = get_restaurants_from_osm(center_lat, center_lon, settings['radius'], dish_input)
+                polygon, radius = None, settings['radius']
+                if settings['max_minutes']:
+                    polygon, iso_radius = get_isochrone(center_lat, center_lon, settings['max_minutes'], settings['mode'])
+                    if polygon:
+                        radius = iso_radius
+                    else:
+                        # OSRM lỗi/ngắt mạch: không bỏ qua bộ lọc thời gian mà quy ra bán kính theo vận tốc
+                        radius = int(min(settings['max_minutes'] * 60 * travel_speed(settings['mode']), ISOCHRONE_MAX_RADIUS))
+                        st.warning(get_text("isochrone_unavailable", lang).format(settings['max_minutes'], radius / 1000))
+                st.session_state.isochrone = polygon
+
+                raw_results = get_restaurants_from_osm(center_lat, center_lon, radius, dish_input)
+                if polygon:
+                    # Bỏ các quán trong vòng tròn nhưng không tới kịp (bên kia sông, cao tốc...)
+                    raw_results = places_in_isochrone(raw_results, polygon)
                 
-                # Gọi hàm process_results từ map_logic.py
-                st.session_state.search_results = process_results(
-                    raw_results, center_lat, center_lon, settings['budget'], lang
-                )
+                # Giữ toàn bộ kết quả trong chỉ mục facet: đổi ngân sách/cuisine chỉ lọc lại trong bộ nhớ
+                index = FacetIndex(process_results(raw_results, center_lat, center_lon))
+                st.session_state.search_index = index
+                st.session_state.cuisine_filter = "all"
+                # Quãng đường thực tế (OSRM table) chỉ tính một lần ở phần hiển thị bên dưới
+                st.session_state.search_results = filter_results(index, settings['budget'])
+                st.session_state.prefetch_pending = True
             
             if not st.session_state.search_results:
                 # Kiểm tra xem từ khóa có phải là món ăn đã biết không
@@ -79,9 +107,24 @@ def render_map_tab(lang):
             st.warning("Vui lòng nhập món ăn bạn muốn tìm!")
 
     # --- HIỂN THỊ KẾT QUẢ ---
-    if st.session_state.get("center_coords") and st.session_state.get("search_results"):
-        results = st.session_state.search_results
+    index = st.session_state.get("search_index")
+    if st.session_state.get("center_coords") and index and index.places:
         slat, slon = st.session_state.center_coords
+        cuisine = render_result_filters(index, lang)
+        # Bảng quãng đường đã cache theo tập điểm nên rerun với cùng bộ lọc không gọi lại OSRM
+        results = apply_travel_matrix(filter_results(index, settings['budget'], cuisine), slat, slon, settings['mode'])
+        st.session_state.search_results = results
+        if not results:
+            st.info(get_text("no_results", lang))
+            return
+        if st.session_state.pop("prefetch_pending", False):
+            # Tải trước lộ trình theo đúng thứ tự đang hiển thị, chỉ sau một lần tìm kiếm mới
+            st.session_state.route_prefetch = prefetch_routes(slat, slon, results, settings['mode'], lang)
+
+        tour = None
+        tour_places = render_tour_picker(results, lang)
+        if len(tour_places) >= TOUR_MIN_STOPS:
+            tour = plan_tour(slat, slon, tour_places, settings['mode'], lang)
 
         col_map, col_list = st.columns([2, 1])
 
@@ -89,7 +132,7 @@ def render_map_tab(lang):
             render_results_list(results, settings['mode'])
 
         with col_map:
-            render_map(slat, slon, results, settings['mode'])
+            render_map(slat, slon, results, settings['mode'], tour)
     else:
         # --- TRANG CHỦ KHI CHƯA TÌM KIẾM ---
         render_home_page()
\ No newline at end of file